@@ -1,3 +1,11 @@
-from .core import FontProcessor, FontTask, FontScalerError
-
 __all__ = ["FontProcessor", "FontScalerError", "FontTask"]
+
+
+def __getattr__(name):
+    # Resolved on first use, so that the CLI can answer metadata and no-op
+    # requests without importing the pipeline.
+    if name in __all__:
+        from . import core
+
+        return getattr(core, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
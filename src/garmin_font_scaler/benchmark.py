@@ -0,0 +1,425 @@
+import datetime
+import json
+import os
+import random
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+
+from typing import List, Optional
+
+from .core import FontScalerError
+from .scheduler import run_tool
+
+# --- Configuration Constants ---
+
+DEFAULT_BENCHMARK_HISTORY_FILENAME = ".font-scaler-benchmarks.jsonl"
+DEFAULT_BENCHMARK_FONTS = 24
+DEFAULT_BENCHMARK_TARGETS = 12
+DEFAULT_BENCHMARK_REPEAT = 5
+
+# A fresh fixture is built from scratch, then built again with no changes.
+SCENARIO_COLD = "cold"
+SCENARIO_NOOP = "noop"
+
+JSON_COMMIT_KEY = "commit"
+JSON_DIRTY_KEY = "dirty"
+JSON_TIMESTAMP_KEY = "timestamp"
+JSON_SCENARIO_KEY = "scenario"
+JSON_FONTS_KEY = "fonts"
+JSON_TARGETS_KEY = "targets"
+JSON_WALL_TIME_KEY = "wallTime"
+JSON_SUBPROCESSES_KEY = "subprocesses"
+JSON_FILES_WRITTEN_KEY = "filesWritten"
+JSON_PEAK_RSS_KEY = "peakRss"
+
+# Metrics compared between commits. Counts are deterministic, so any increase
+# is a regression; timings and memory are noisy and tested for significance.
+EXACT_METRICS = (JSON_SUBPROCESSES_KEY, JSON_FILES_WRITTEN_KEY)
+NOISY_METRICS = (JSON_WALL_TIME_KEY, JSON_PEAK_RSS_KEY)
+
+SIGNIFICANCE_LEVEL = 0.05
+MIN_RELATIVE_CHANGE = 0.05
+PERMUTATION_SAMPLES = 10000
+
+FIXTURE_PROJECT_DIRNAME = "project"
+FIXTURE_TOOL_DIRNAME = "tool"
+FIXTURE_TOOL_FILENAME = "ttf2bmp-stub"
+FIXTURE_INVOCATIONS_FILENAME = "invocations.log"
+FIXTURE_CHARSET = "0123456789:%"
+
+# Stand-in for ttf2bmp: writes a one-page font of fixed-size glyphs per size
+# and logs each invocation, so that builds exercise everything but rendering.
+STUB_FONT_TOOL = """\
+import os
+import struct
+import sys
+import zlib
+
+options = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+if "--charset-file" in options:
+    with open(options["--charset-file"], encoding="utf-8") as f:
+        charset = f.read()
+else:
+    charset = options["-c"]
+
+width = height = 64
+raw = b"".join(b"\\x00" + bytes(width * 4) for _ in range(height))
+chunks = [
+    (b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)),
+    (b"IDAT", zlib.compress(raw)),
+    (b"IEND", b""),
+]
+png = b"\\x89PNG\\r\\n\\x1a\\n" + b"".join(
+    struct.pack(">I", len(body)) + kind + body
+    + struct.pack(">I", zlib.crc32(kind + body) & 0xFFFFFFFF)
+    for kind, body in chunks
+)
+
+font_name = os.path.splitext(os.path.basename(options["-f"]))[0]
+for size in options["-s"].split(","):
+    stem = f"{font_name}-{size}"
+    lines = [
+        f"info face={font_name} size={size}",
+        f"common lineHeight={size} base={size} scaleW={width} scaleH={height} pages=1",
+        f'page id=0 file="{stem}_0.png"',
+        f"chars count={len(charset)}",
+    ]
+    for i, char in enumerate(charset):
+        lines.append(
+            f"char id={ord(char)} x={i % 8 * 8} y={i // 8 * 8} width=7 height=7 "
+            f"xoffset=0 yoffset=0 xadvance=8 page=0 chnl=15"
+        )
+    with open(os.path.join(options["-o"], f"{stem}.fnt"), "w") as f:
+        f.write("\\n".join(lines) + "\\n")
+    with open(os.path.join(options["-o"], f"{stem}_0.png"), "wb") as f:
+        f.write(png)
+
+log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "{log}")
+with open(log_path, "a") as f:
+    f.write(options["-f"] + "\\n")
+""".replace("{log}", FIXTURE_INVOCATIONS_FILENAME)
+
+
+# --- Helpers ---
+
+
+def create_fixture(root, font_count, target_count):
+    """
+    Write a synthetic project with one TTF per font and a mix of target
+    shapes and resolutions, plus the stub font tool.
+    Returns the project directory and the stub tool path.
+    """
+    project_dir = os.path.join(root, FIXTURE_PROJECT_DIRNAME)
+    fonts_dir = os.path.join(project_dir, "resources", "fonts")
+    os.makedirs(fonts_dir)
+
+    shapes = ("round", "rectangle", "semi-round")
+    resolutions = {
+        "reference": {"resolution": [280, 280], "shape": "round"},
+        "targets": [
+            {
+                "resolution": [176 + 16 * i, 176 + 16 * i + 24 * (i % 3 == 1)],
+                "shape": shapes[i % len(shapes)],
+            }
+            for i in range(target_count)
+        ],
+    }
+    charsets = [
+        {"fontId": f"Font{i}", "fontCharset": FIXTURE_CHARSET[: 4 + i % 8]}
+        for i in range(0, font_count, 2)
+    ]
+    font_lines = [
+        f'        <font id="Font{i}" filename="Bench{i}-{16 + i % 40}.fnt" />'
+        for i in range(font_count)
+    ]
+    xml = "\n".join(
+        [
+            "<resources>",
+            "    <fonts>",
+            *font_lines,
+            "    </fonts>",
+            f'    <jsonData id="ScreenResolutions">{json.dumps(resolutions)}</jsonData>',
+            f'    <jsonData id="DefaultCharset">"{FIXTURE_CHARSET}"</jsonData>',
+            f'    <jsonData id="FontCharsets">{json.dumps(charsets)}</jsonData>',
+            "</resources>",
+            "",
+        ]
+    )
+    with open(os.path.join(fonts_dir, "fonts.xml"), "w", encoding="utf-8") as f:
+        f.write(xml)
+    for i in range(font_count):
+        with open(os.path.join(fonts_dir, f"Bench{i}.ttf"), "wb") as f:
+            f.write(f"synthetic font {i}".encode("utf-8"))
+
+    tool_dir = os.path.join(root, FIXTURE_TOOL_DIRNAME)
+    os.makedirs(tool_dir)
+    tool_path = os.path.join(tool_dir, FIXTURE_TOOL_FILENAME)
+    with open(tool_path, "w", encoding="utf-8") as f:
+        f.write(f"#!{sys.executable}\n{STUB_FONT_TOOL}")
+    os.chmod(tool_path, os.stat(tool_path).st_mode | stat.S_IXUSR)
+    return project_dir, tool_path
+
+
+def snapshot_outputs(project_dir):
+    """Stat markers of all files in a project, skipping dot files and dirs."""
+    snapshot = {}
+    for dirpath, dirnames, filenames in os.walk(project_dir):
+        dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+        for filename in filenames:
+            if filename.startswith("."):
+                continue
+            path = os.path.join(dirpath, filename)
+            stat_result = os.stat(path)
+            snapshot[path] = (stat_result.st_mtime_ns, stat_result.st_size)
+    return snapshot
+
+
+def current_commit(source_dir):
+    """
+    Return the HEAD commit hash of the checkout holding source_dir and whether
+    its work tree has changes. Sources outside a checkout, or not tracked by
+    it, are reported as an unknown dirty commit, so they are never compared.
+    """
+
+    def git(*args):
+        return subprocess.run(
+            ["git", *args], cwd=source_dir, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    try:
+        git("ls-files", "--error-unmatch", os.path.join(source_dir, __package__))
+        commit = git("rev-parse", "HEAD")
+        status = git("status", "--porcelain", "--untracked-files=no")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", True
+    return commit, bool(status)
+
+
+def mean(values):
+    return sum(values) / len(values)
+
+
+def permutation_p_value(baseline, candidate, samples=PERMUTATION_SAMPLES):
+    """
+    One-sided p-value of the candidate mean exceeding the baseline mean by
+    at least the observed difference, under random relabelling of samples.
+    """
+    observed = mean(candidate) - mean(baseline)
+    pooled = list(baseline) + list(candidate)
+    rng = random.Random(0)
+    extreme = 0
+    for _ in range(samples):
+        rng.shuffle(pooled)
+        difference = mean(pooled[len(baseline) :]) - mean(pooled[: len(baseline)])
+        if difference >= observed:
+            extreme += 1
+    return (extreme + 1) / (samples + 1)
+
+
+# --- Core Logic ---
+
+
+class BenchmarkHistory:
+    """Benchmark results, one JSON object per line, appended across runs."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self) -> List[dict]:
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+        return records
+
+    def append(self, records):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+def run_benchmark(
+    history_path,
+    font_count=DEFAULT_BENCHMARK_FONTS,
+    target_count=DEFAULT_BENCHMARK_TARGETS,
+    repeat=DEFAULT_BENCHMARK_REPEAT,
+) -> List[dict]:
+    """
+    Build a fresh synthetic fixture repeat times, each followed by a no-op
+    rebuild, and append the measurements to the history.
+    """
+    if not hasattr(os, "wait4"):
+        raise FontScalerError("Benchmarks require a POSIX platform.")
+
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    commit, dirty = current_commit(package_parent)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [package_parent, env.get("PYTHONPATH")])
+    )
+
+    records = []
+    for _ in range(repeat):
+        root = tempfile.mkdtemp(prefix="font-scaler-benchmark-")
+        try:
+            project_dir, tool_path = create_fixture(root, font_count, target_count)
+            invocations_path = os.path.join(
+                os.path.dirname(tool_path), FIXTURE_INVOCATIONS_FILENAME
+            )
+            command = [
+                sys.executable,
+                "-m",
+                "garmin_font_scaler.cli",
+                "--project-dir",
+                project_dir,
+                "--tool-path",
+                tool_path,
+            ]
+            for scenario in (SCENARIO_COLD, SCENARIO_NOOP):
+                before = snapshot_outputs(project_dir)
+                if os.path.exists(invocations_path):
+                    os.remove(invocations_path)
+                try:
+                    tool_run = run_tool(command, env=env)
+                except subprocess.CalledProcessError as e:
+                    raise FontScalerError(f"Benchmark build failed: {e}")
+                after = snapshot_outputs(project_dir)
+
+                subprocesses = 0
+                if os.path.exists(invocations_path):
+                    with open(invocations_path, "r", encoding="utf-8") as f:
+                        subprocesses = len(f.readlines())
+                records.append(
+                    {
+                        JSON_COMMIT_KEY: commit,
+                        JSON_DIRTY_KEY: dirty,
+                        JSON_TIMESTAMP_KEY: datetime.datetime.now().isoformat(
+                            timespec="seconds"
+                        ),
+                        JSON_SCENARIO_KEY: scenario,
+                        JSON_FONTS_KEY: font_count,
+                        JSON_TARGETS_KEY: target_count,
+                        JSON_WALL_TIME_KEY: round(tool_run.wall_time, 4),
+                        JSON_SUBPROCESSES_KEY: subprocesses,
+                        JSON_FILES_WRITTEN_KEY: sum(
+                            1 for path in after if before.get(path) != after[path]
+                        ),
+                        JSON_PEAK_RSS_KEY: tool_run.peak_rss,
+                    }
+                )
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    BenchmarkHistory(history_path).append(records)
+    return records
+
+
+def compare_benchmarks(
+    history_path, baseline=None, candidate=None, file=None
+) -> List[str]:
+    """
+    Compare the results of a candidate commit against a baseline commit,
+    each given as a hash prefix, and write a summary table.
+    The candidate defaults to the most recent commit in the history and the
+    baseline to the commit benchmarked before it. Runs on a dirty tree are
+    left out, since they do not measure the commit they are recorded under.
+    Returns a description of every regression found.
+    """
+    file = file or sys.stdout
+    records = [
+        record
+        for record in BenchmarkHistory(history_path).load()
+        if not record.get(JSON_DIRTY_KEY)
+    ]
+    commits = []
+    for record in records:
+        if record[JSON_COMMIT_KEY] not in commits:
+            commits.append(record[JSON_COMMIT_KEY])
+
+    candidate_commit = _resolve_commit(commits, candidate) if candidate else None
+    if candidate_commit is None:
+        if candidate or not commits:
+            raise FontScalerError(f"No benchmark results for '{candidate or 'HEAD'}'.")
+        candidate_commit = commits[-1]
+    if baseline:
+        baseline_commit = _resolve_commit(commits, baseline)
+    else:
+        index = commits.index(candidate_commit)
+        baseline_commit = commits[index - 1] if index > 0 else None
+    if baseline_commit is None:
+        raise FontScalerError(f"No benchmark results for '{baseline or 'baseline'}'.")
+
+    # Compare on the fixture the candidate was most recently benchmarked on
+    latest = [r for r in records if r[JSON_COMMIT_KEY] == candidate_commit][-1]
+    fixture = (latest[JSON_FONTS_KEY], latest[JSON_TARGETS_KEY])
+    candidate_records, baseline_records = (
+        [
+            r
+            for r in records
+            if r[JSON_COMMIT_KEY] == commit
+            and (r[JSON_FONTS_KEY], r[JSON_TARGETS_KEY]) == fixture
+        ]
+        for commit in (candidate_commit, baseline_commit)
+    )
+    if not baseline_records:
+        raise FontScalerError(
+            f"No results for {baseline_commit[:12]} on a fixture of "
+            f"{fixture[0]} fonts and {fixture[1]} targets."
+        )
+
+    file.write(
+        f"Baseline {baseline_commit[:12]} vs candidate {candidate_commit[:12]} "
+        f"({fixture[0]} fonts, {fixture[1]} targets)\n\n"
+    )
+    file.write("| Scenario | Metric | Baseline | Candidate | Change | p | Verdict |\n")
+    file.write("|:---|:---|---:|---:|---:|---:|:---|\n")
+
+    regressions = []
+    scenarios = sorted(set(r[JSON_SCENARIO_KEY] for r in candidate_records))
+    for scenario in scenarios:
+        for metric in EXACT_METRICS + NOISY_METRICS:
+            base = _metric_values(baseline_records, scenario, metric)
+            cand = _metric_values(candidate_records, scenario, metric)
+            if not base or not cand:
+                continue
+            change = mean(cand) / mean(base) - 1 if mean(base) else 0.0
+            p_value = None
+            if metric in EXACT_METRICS:
+                regressed = mean(cand) > mean(base)
+            else:
+                p_value = permutation_p_value(base, cand)
+                regressed = (
+                    change > MIN_RELATIVE_CHANGE and p_value < SIGNIFICANCE_LEVEL
+                )
+            verdict = "REGRESSION" if regressed else "ok"
+            file.write(
+                f"| {scenario} | {metric} | {mean(base):.4g} | {mean(cand):.4g} "
+                f"| {change:+.1%} | {'-' if p_value is None else f'{p_value:.3f}'} "
+                f"| {verdict} |\n"
+            )
+            if regressed:
+                regressions.append(
+                    f"{scenario} {metric}: {mean(base):.4g} -> {mean(cand):.4g}"
+                )
+    return regressions
+
+
+def _resolve_commit(commits, prefix) -> Optional[str]:
+    matches = [commit for commit in commits if commit.startswith(prefix)]
+    if len(matches) > 1:
+        raise FontScalerError(f"Commit prefix '{prefix}' is ambiguous.")
+    return matches[0] if matches else None
+
+
+def _metric_values(records, scenario, metric):
+    return [
+        r[metric]
+        for r in records
+        if r[JSON_SCENARIO_KEY] == scenario and r.get(metric) is not None
+    ]
@@ -0,0 +1,275 @@
+import dataclasses
+import os
+import re
+
+from typing import Dict, List, Tuple
+
+from .pngopt import decode_rgba, encode_rgba
+
+# --- Configuration Constants ---
+
+FNT_ATTRIBUTE_REGEX = r'(\w+)=("[^"]*"|\S+)'
+FNT_ENCODING = "utf-8"
+
+# Additional pages of a reassembled font: <font-name>-<size>_<page>.png
+PAGE_FILENAME_TEMPLATE = "{stem}_{page}.png"
+
+DEFAULT_SPACING = (1, 1)
+
+
+# --- Data Structures ---
+
+
+@dataclasses.dataclass
+class BitmapFont:
+    """
+    AngelCode BMFont in text format. Attribute values are kept as written,
+    so that lines the scaler does not change are reproduced verbatim.
+    """
+
+    info: Dict[str, str]
+    common: Dict[str, str]
+    pages: Dict[int, str]
+    chars: Dict[int, Dict[str, str]]
+    kernings: List[Dict[str, str]]
+
+
+@dataclasses.dataclass
+class Glyph:
+    width: int
+    height: int
+    xoffset: int
+    yoffset: int
+    xadvance: int
+    chnl: int
+    pixels: bytes  # RGBA rows, width * height * 4 bytes
+
+
+# --- Helpers ---
+
+
+def unquote(value):
+    return value[1:-1] if value.startswith('"') and value.endswith('"') else value
+
+
+def parse_fnt(text) -> BitmapFont:
+    font = BitmapFont(info={}, common={}, pages={}, chars={}, kernings=[])
+    for line in text.splitlines():
+        tag, _, rest = line.strip().partition(" ")
+        attributes = dict(re.findall(FNT_ATTRIBUTE_REGEX, rest))
+        if tag == "info":
+            font.info = attributes
+        elif tag == "common":
+            font.common = attributes
+        elif tag == "page":
+            font.pages[int(attributes["id"])] = unquote(attributes["file"])
+        elif tag == "char":
+            font.chars[int(attributes["id"])] = attributes
+        elif tag == "kerning":
+            font.kernings.append(attributes)
+    if not font.common:
+        raise ValueError("Not a BMFont text file")
+    return font
+
+
+def format_fnt(font: BitmapFont):
+    def line(tag, attributes):
+        return " ".join([tag] + [f"{k}={v}" for k, v in attributes.items()])
+
+    lines = [line("info", font.info), line("common", font.common)]
+    for page_id in sorted(font.pages):
+        lines.append(line("page", {"id": page_id, "file": f'"{font.pages[page_id]}"'}))
+    lines.append(line("chars", {"count": len(font.chars)}))
+    for codepoint in sorted(font.chars):
+        lines.append(line("char", font.chars[codepoint]))
+    if font.kernings:
+        lines.append(line("kernings", {"count": len(font.kernings)}))
+        for kerning in font.kernings:
+            lines.append(line("kerning", kerning))
+    return "\n".join(lines) + "\n"
+
+
+def load_fnt(fnt_path) -> BitmapFont:
+    with open(fnt_path, "r", encoding=FNT_ENCODING) as f:
+        return parse_fnt(f.read())
+
+
+def read_font(fnt_path) -> Tuple[BitmapFont, Dict[int, Glyph]]:
+    """Read a rendered font and crop every glyph out of its pages."""
+    font = load_fnt(fnt_path)
+
+    pages = {}
+    for page_id, filename in font.pages.items():
+        with open(os.path.join(os.path.dirname(fnt_path), filename), "rb") as f:
+            pages[page_id] = decode_rgba(f.read())
+
+    glyphs = {}
+    for codepoint, char in font.chars.items():
+        x, y = int(char["x"]), int(char["y"])
+        width, height = int(char["width"]), int(char["height"])
+        page_width, _, rows = pages[int(char.get("page", 0))]
+        if x + width > page_width or y + height > len(rows):
+            raise ValueError(f"Glyph {codepoint} lies outside its page")
+        glyphs[codepoint] = Glyph(
+            width=width,
+            height=height,
+            xoffset=int(char["xoffset"]),
+            yoffset=int(char["yoffset"]),
+            xadvance=int(char["xadvance"]),
+            chnl=int(char.get("chnl", 15)),
+            pixels=b"".join(
+                bytes(rows[y + row][x * 4 : (x + width) * 4]) for row in range(height)
+            ),
+        )
+    return font, glyphs
+
+
+def pack_glyphs(glyphs: Dict[int, Glyph], page_width, page_height, spacing):
+    """
+    Shelf-pack glyphs, tallest first, into pages of the given size.
+    Returns the (page, x, y) position of every glyph.
+    """
+    spacing_x, spacing_y = spacing
+    positions = {}
+    page, x, y, shelf_height = 0, 0, 0, 0
+    for codepoint in sorted(glyphs, key=lambda c: (-glyphs[c].height, c)):
+        glyph = glyphs[codepoint]
+        if glyph.width > page_width or glyph.height > page_height:
+            raise ValueError(f"Glyph {codepoint} does not fit a page")
+        if x + glyph.width > page_width:
+            x, y, shelf_height = 0, y + shelf_height + spacing_y, 0
+        if y + glyph.height > page_height:
+            page, x, y, shelf_height = page + 1, 0, 0, 0
+        positions[codepoint] = (page, x, y)
+        x += glyph.width + spacing_x
+        shelf_height = max(shelf_height, glyph.height)
+    return positions
+
+
+def merge_kernings(fonts):
+    kernings = {}
+    for font in fonts:
+        for kerning in font.kernings:
+            kernings.setdefault((kerning["first"], kerning["second"]), kerning)
+    return list(kernings.values())
+
+
+def assemble_font(template: BitmapFont, glyphs: Dict[int, Glyph], stem, kernings=None):
+    """
+    Build a font from individual glyphs, using the info and common lines of a
+    rendered template. Returns the .fnt text and the PNG pages by filename.
+    """
+    page_width = int(template.common["scaleW"])
+    page_height = int(template.common["scaleH"])
+    spacing = DEFAULT_SPACING
+    if "spacing" in template.info:
+        spacing = tuple(int(v) for v in template.info["spacing"].split(","))
+
+    positions = pack_glyphs(glyphs, page_width, page_height, spacing)
+    page_count = max((page for page, _, _ in positions.values()), default=0) + 1
+
+    first_page = template.pages.get(0, PAGE_FILENAME_TEMPLATE.format(stem=stem, page=0))
+    page_filenames = {
+        page: first_page
+        if page == 0
+        else PAGE_FILENAME_TEMPLATE.format(stem=stem, page=page)
+        for page in range(page_count)
+    }
+    page_rows = {
+        page: [bytearray(page_width * 4) for _ in range(page_height)]
+        for page in range(page_count)
+    }
+
+    chars = {}
+    for codepoint, glyph in glyphs.items():
+        page, x, y = positions[codepoint]
+        rows = page_rows[page]
+        for row in range(glyph.height):
+            start = row * glyph.width * 4
+            rows[y + row][x * 4 : (x + glyph.width) * 4] = glyph.pixels[
+                start : start + glyph.width * 4
+            ]
+        chars[codepoint] = {
+            "id": str(codepoint),
+            "x": str(x),
+            "y": str(y),
+            "width": str(glyph.width),
+            "height": str(glyph.height),
+            "xoffset": str(glyph.xoffset),
+            "yoffset": str(glyph.yoffset),
+            "xadvance": str(glyph.xadvance),
+            "page": str(page),
+            "chnl": str(glyph.chnl),
+        }
+
+    common = dict(template.common)
+    common["pages"] = str(page_count)
+    font = BitmapFont(
+        info=dict(template.info),
+        common=common,
+        pages=page_filenames,
+        chars=chars,
+        kernings=kernings or [],
+    )
+    pages = {
+        page_filenames[page]: encode_rgba(page_width, page_height, page_rows[page])
+        for page in range(page_count)
+    }
+    return format_fnt(font), pages
+
+
+def merge_fonts(fnt_paths, stem):
+    """
+    Merge fonts rendered from disjoint parts of one charset into a single font.
+    Pages are appended in order and renumbered; when the parts use different
+    page sizes, all glyphs are repacked into pages of the largest size instead.
+    Kerning pairs are combined, so only pairs within one part are kept.
+    Returns the .fnt text and the PNG pages by filename.
+    """
+    fonts = [load_fnt(fnt_path) for fnt_path in fnt_paths]
+    template = fonts[0]
+    kernings = merge_kernings(fonts)
+
+    page_sizes = set((font.common["scaleW"], font.common["scaleH"]) for font in fonts)
+    if len(page_sizes) > 1:
+        glyphs = {}
+        for fnt_path in fnt_paths:
+            glyphs.update(read_font(fnt_path)[1])
+        common = dict(template.common)
+        common["scaleW"] = str(max(int(width) for width, _ in page_sizes))
+        common["scaleH"] = str(max(int(height) for _, height in page_sizes))
+        template = dataclasses.replace(template, common=common)
+        return assemble_font(template, glyphs, stem, kernings)
+
+    first_page = template.pages.get(0, PAGE_FILENAME_TEMPLATE.format(stem=stem, page=0))
+    page_filenames = {}
+    pages = {}
+    chars = {}
+    for fnt_path, font in zip(fnt_paths, fonts):
+        page_ids = {}
+        for page_id in sorted(font.pages):
+            page = len(page_filenames)
+            page_ids[page_id] = page
+            page_filenames[page] = (
+                first_page
+                if page == 0
+                else PAGE_FILENAME_TEMPLATE.format(stem=stem, page=page)
+            )
+            page_path = os.path.join(os.path.dirname(fnt_path), font.pages[page_id])
+            with open(page_path, "rb") as f:
+                pages[page_filenames[page]] = f.read()
+        for codepoint, char in font.chars.items():
+            if codepoint not in chars:
+                page = page_ids[int(char.get("page", 0))]
+                chars[codepoint] = dict(char, page=str(page))
+
+    common = dict(template.common)
+    common["pages"] = str(len(page_filenames))
+    font = BitmapFont(
+        info=dict(template.info),
+        common=common,
+        pages=page_filenames,
+        chars=chars,
+        kernings=kernings,
+    )
+    return format_fnt(font), pages
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# --- Configuration Constants ---
+
+HASH_CHUNK_SIZE = 1 << 20
+
+# Upper bound on the font tool outputs a long-lived process keeps in memory
+DEFAULT_RENDER_CACHE_MAX_BYTES = 256 << 20
+
+
+# --- Helpers ---
+
+
+def stat_key(path) -> Optional[Tuple[int, int]]:
+    """Cheap change marker for a file: (mtime in ns, size), None if missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_values(*values):
+    """Stable digest of JSON-serialisable values, used as a cache key."""
+    payload = json.dumps(values, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# --- Core Logic ---
+
+
+class FileFingerprints:
+    """
+    Content digests of files, re-hashed only when a file's mtime or size
+    changes, so repeat lookups cost a single stat call.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def digest(self, path):
+        path = os.path.abspath(path)
+        key = stat_key(path)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        digest = hash_file(path)
+        with self._lock:
+            self._entries[path] = (key, digest)
+        return digest
+
+
+class RenderCache:
+    """
+    In-memory store of font tool outputs (file name to content), keyed by a
+    digest of everything that determines the rendered files. The least
+    recently used entries are evicted once the outputs exceed max_bytes.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_RENDER_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, Dict[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Dict[str, bytes]]:
+        with self._lock:
+            outputs = self._entries.get(key)
+            if outputs is not None:
+                self._entries.move_to_end(key)
+            return outputs
+
+    def put(self, key, outputs: Dict[str, bytes]):
+        size = self._size(outputs)
+        with self._lock:
+            if key in self._entries:
+                self.size_bytes -= self._size(self._entries.pop(key))
+            if size > self.max_bytes:
+                return
+            self._entries[key] = outputs
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= self._size(evicted)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _size(self, outputs):
+        return sum(len(content) for content in outputs.values())
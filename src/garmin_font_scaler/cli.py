@@ -1,21 +1,55 @@
 import argparse
+import os
 import sys
-from .core import FontProcessor, FontScalerError, DEFAULT_PROJECT_DIR
 
+from .stamp import (
+    DEFAULT_STAMP_FILENAME,
+    BuildStamp,
+    find_executable,
+    package_paths,
+    snapshot,
+)
 
-try:
-    from importlib.metadata import version, PackageNotFoundError
-except ImportError:
-    pass
+# The pipeline is imported only after the metadata and up-to-date fast paths
+# are ruled out, so that those return without loading it.
+
+# Commands forwarded to a daemon when a socket is given
+CLIENT_COMMANDS = (None, "report")
+
+# Options that do not change what a build writes
+NON_BUILD_OPTIONS = (
+    "command",
+    "plan",
+    "socket",
+    "force",
+    "jobs",
+    "memory_limit",
+    "history_file",
+)
 
 
 def get_version():
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:
+        return "0.0.0-dev"
     try:
         return version("garmin-font-scaler")
     except PackageNotFoundError:
         return "0.0.0-dev"
 
 
+class VersionAction(argparse.Action):
+    """Print the version, looked up only when requested, and exit."""
+
+    def __init__(self, option_strings, dest, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        print(f"{parser.prog} {get_version()}")
+        sys.exit(0)
+
+
 class AboutAction(argparse.Action):
     """Custom action to print about info to stderr and exit."""
 
@@ -34,6 +68,54 @@ class AboutAction(argparse.Action):
         sys.exit(0)
 
 
+def run_client(args):
+    """Forward a request to the daemon and relay its log and output."""
+    from .client import (
+        COMMAND_BUILD,
+        COMMAND_PLAN,
+        COMMAND_REPORT,
+        JSON_ERROR_KEY,
+        JSON_LOG_KEY,
+        JSON_OK_KEY,
+        JSON_OUTPUT_KEY,
+        DaemonError,
+        send_request,
+    )
+
+    if args.command == "report":
+        command = COMMAND_REPORT
+    elif args.plan:
+        command = COMMAND_PLAN
+    else:
+        command = COMMAND_BUILD
+
+    options = {
+        "project_dir": os.path.abspath(args.project_dir),
+        "resources_dir": args.resources_dir,
+        "fonts_subdir": args.fonts_subdir,
+        "xml_file": args.xml_file,
+        "tool_path": args.tool_path,
+        "padding": args.padding,
+        "charset_file_option": args.charset_file_option,
+        "jobs": args.jobs,
+        "memory_limit": args.memory_limit,
+        "history_file": args.history_file,
+        "optimize_png": args.optimize_png,
+        "chunk_size": args.chunk_size,
+        "glyph_cache": args.glyph_cache,
+        "table": args.table,
+        "only_targets": args.only_targets,
+        "only_fonts": args.only_fonts,
+        "shard": args.shard,
+        "partial_report": args.partial_report,
+    }
+    response = send_request(args.socket, command, options)
+    sys.stderr.write(response.get(JSON_LOG_KEY, ""))
+    sys.stdout.write(response.get(JSON_OUTPUT_KEY, ""))
+    if not response.get(JSON_OK_KEY):
+        raise DaemonError(response.get(JSON_ERROR_KEY))
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Garmin Font Scaler",
@@ -46,12 +128,12 @@ def main():
     )
 
     parser.add_argument(
-        "--version", action="version", version=f"%(prog)s {get_version()}"
+        "--version", action=VersionAction, help="show program's version number and exit"
     )
 
     parser.add_argument(
         "--project-dir",
-        default=DEFAULT_PROJECT_DIR,
+        default=".",
         help="Base directory of the Garmin project (containing 'resources' folder)",
     )
 
@@ -80,6 +162,51 @@ def main():
         help="Padding for the font characters (passed to ttf2bmp)",
     )
 
+    parser.add_argument(
+        "--charset-file-option",
+        metavar="OPTION",
+        help="Font tool option reading the charset from a file, used for "
+        "charsets longer than 1024 characters (default: pass them with -c)",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Maximum number of parallel font tool invocations (default: CPU count)",
+    )
+
+    parser.add_argument(
+        "--memory-limit",
+        type=int,
+        help="Memory ceiling in MB for concurrently running font tool invocations",
+    )
+
+    parser.add_argument(
+        "--history-file",
+        default=".font-scaler-history.json",
+        help="File recording font tool wall time and peak memory across runs",
+    )
+
+    parser.add_argument(
+        "--optimize-png",
+        action="store_true",
+        help="Losslessly recompress generated PNG font pages (cached by content)",
+    )
+
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="Split charsets longer than this many characters into chunks "
+        "rendered in parallel and merged into one font",
+    )
+
+    parser.add_argument(
+        "--glyph-cache",
+        action="store_true",
+        help="Cache rendered glyphs and render only glyphs missing from the cache",
+    )
+
     parser.add_argument(
         "--table",
         nargs="?",
@@ -88,10 +215,237 @@ def main():
         help="Generate markdown table of sizes (writes to stdout if no file is specified)",
     )
 
+    parser.add_argument(
+        "--shard",
+        help="Process only shard i of N (e.g. 2/4) and write a partial JSON report",
+    )
+
+    parser.add_argument(
+        "--partial-report",
+        help="Filename of the partial JSON report written by a shard "
+        "(default: fonts-shard-<i>-of-<N>.json)",
+    )
+
+    parser.add_argument(
+        "--only-targets",
+        help="Comma-separated globs matching target keys (e.g. round-454x454) "
+        "or device ids; other targets are left untouched",
+    )
+
+    parser.add_argument(
+        "--only-fonts",
+        help="Comma-separated globs matching font ids, TTF filenames or font "
+        "names; other fonts are not re-rendered",
+    )
+
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Print the font tool invocations per target without rendering",
+    )
+
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Build even if no inputs or outputs changed since the last build",
+    )
+
+    parser.add_argument(
+        "--socket",
+        help="Send the request to a daemon listening on this Unix socket",
+    )
+
+    subparsers = parser.add_subparsers(dest="command")
+    merge_parser = subparsers.add_parser(
+        "merge",
+        help="Merge partial JSON reports from sharded runs into the markdown report",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    merge_parser.add_argument(
+        "partial_reports", nargs="+", help="Partial JSON reports to merge"
+    )
+    merge_parser.add_argument(
+        "--table",
+        default="fonts.md",
+        help="Markdown report to write ('-' for stdout)",
+    )
+
+    report_parser = subparsers.add_parser(
+        "report",
+        help="Write the markdown report of font sizes without rendering fonts",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    report_parser.add_argument(
+        "--table", default="-", help="Markdown report to write ('-' for stdout)"
+    )
+
+    daemon_parser = subparsers.add_parser(
+        "daemon",
+        help="Serve build, plan and report requests over a Unix socket, keeping "
+        "parsed sources and rendered fonts in memory",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    daemon_parser.add_argument(
+        "--stop", action="store_true", help="Stop the daemon listening on the socket"
+    )
+
+    benchmark_parser = subparsers.add_parser(
+        "benchmark",
+        help="Benchmark builds of a synthetic project and compare results across commits",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    benchmark_parser.add_argument(
+        "--results",
+        default=".font-scaler-benchmarks.jsonl",
+        help="JSON-lines file collecting benchmark results across runs",
+    )
+    benchmark_subparsers = benchmark_parser.add_subparsers(
+        dest="benchmark_command", required=True
+    )
+    benchmark_run_parser = benchmark_subparsers.add_parser(
+        "run",
+        help="Build a synthetic project with a stub font tool and record the results",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    benchmark_run_parser.add_argument(
+        "--fonts", type=int, default=24, help="Number of fonts"
+    )
+    benchmark_run_parser.add_argument(
+        "--targets",
+        type=int,
+        default=12,
+        help="Number of target resolutions",
+    )
+    benchmark_run_parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of measured builds per scenario",
+    )
+    benchmark_compare_parser = benchmark_subparsers.add_parser(
+        "compare",
+        help="Report regressions of a candidate commit against a baseline; "
+        "exits with status 1 if any are found",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    benchmark_compare_parser.add_argument(
+        "--baseline",
+        help="Commit hash prefix of the baseline (default: the commit "
+        "benchmarked before the candidate)",
+    )
+    benchmark_compare_parser.add_argument(
+        "--candidate",
+        help="Commit hash prefix of the candidate (default: the latest benchmarked commit)",
+    )
+
     args = parser.parse_args()
 
+    stamp = None
+    if is_local_build(args):
+        stamp = BuildStamp(os.path.join(args.project_dir, DEFAULT_STAMP_FILENAME))
+        if not args.force and stamp.is_current(build_options(args)):
+            print(
+                "Up to date: no inputs or outputs changed since the last build.",
+                file=sys.stderr,
+            )
+            return
+
+    run(args, stamp)
+
+
+def is_local_build(args):
+    """Whether the arguments ask for a full build in this process."""
+    return (
+        args.command is None
+        and not args.plan
+        and not args.socket
+        and not args.shard
+        and args.table != "-"
+    )
+
+
+def build_options(args):
+    options = {
+        name: value
+        for name, value in vars(args).items()
+        if name not in NON_BUILD_OPTIONS
+    }
+    options["project_dir"] = os.path.abspath(args.project_dir)
+    return options
+
+
+def build_inputs(args, processor):
+    """Stat markers of everything a build reads, taken before it starts."""
+    paths = processor.input_paths() + package_paths()
+    tool_path = find_executable(args.tool_path)
+    if tool_path:
+        paths.append(tool_path)
+    return snapshot([os.path.abspath(path) for path in paths])
+
+
+def run(args, stamp=None):
+    from .client import DaemonError
+
+    if args.socket and args.command in CLIENT_COMMANDS:
+        try:
+            run_client(args)
+        except DaemonError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    from .core import FontProcessor, FontScalerError
+
     try:
-        (
+        if args.command == "merge":
+            (
+                FontProcessor()
+                .with_project_dir(args.project_dir)
+                .with_table_filename(args.table)
+                .load_partial_reports(args.partial_reports)
+                .write_report()
+            )
+            return
+
+        if args.command == "benchmark":
+            from .benchmark import compare_benchmarks, run_benchmark
+
+            if args.benchmark_command == "run":
+                records = run_benchmark(
+                    args.results, args.fonts, args.targets, args.repeat
+                )
+                print(
+                    f"Recorded {len(records)} benchmark result(s) in {args.results}",
+                    file=sys.stderr,
+                )
+                return
+            regressions = compare_benchmarks(
+                args.results, args.baseline, args.candidate
+            )
+            if regressions:
+                print(f"Error: {len(regressions)} regression(s) found", file=sys.stderr)
+                sys.exit(1)
+            return
+
+        if args.command == "daemon":
+            from .client import (
+                COMMAND_SHUTDOWN,
+                DEFAULT_SOCKET_FILENAME,
+                send_request,
+            )
+            from .daemon import FontScalerDaemon
+
+            socket_path = args.socket or os.path.join(
+                args.project_dir, DEFAULT_SOCKET_FILENAME
+            )
+            if args.stop:
+                send_request(socket_path, COMMAND_SHUTDOWN)
+            else:
+                print(f"Listening on {socket_path}", file=sys.stderr)
+                FontScalerDaemon(socket_path).serve_forever()
+            return
+
+        processor = (
             FontProcessor()
             .with_project_dir(args.project_dir)
             .with_resources_dir(args.resources_dir)
@@ -99,11 +453,36 @@ def main():
             .with_xml_file_name(args.xml_file)
             .with_font_tool_path(args.tool_path)
             .with_font_tool_padding(args.padding)
+            .with_charset_file_option(args.charset_file_option)
+            .with_max_workers(args.jobs)
+            .with_memory_limit(args.memory_limit)
+            .with_history_filename(args.history_file)
+            .with_png_optimization(args.optimize_png)
+            .with_chunk_size(args.chunk_size)
+            .with_glyph_cache(args.glyph_cache)
             .with_table_filename(args.table)
+            .with_target_filter(args.only_targets)
+            .with_font_filter(args.only_fonts)
+            .with_shard(args.shard)
+            .with_partial_report_filename(args.partial_report)
             .parse_source_xml()
-            .execute()
         )
-    except FontScalerError as e:
+        if args.command == "report":
+            processor.write_report()
+        elif args.plan:
+            processor.write_plan()
+        elif stamp is None:
+            processor.execute()
+        else:
+            inputs = build_inputs(args, processor)
+            stamp.remove()
+            processor.execute()
+            stamp.save(
+                build_options(args),
+                inputs,
+                [os.path.abspath(path) for path in processor.output_paths],
+            )
+    except (FontScalerError, DaemonError) as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
     except Exception as e:
@@ -0,0 +1,56 @@
+import json
+import socket
+
+# Kept free of pipeline imports, so that clients of a running daemon start
+# without loading it.
+
+# --- Configuration Constants ---
+
+DEFAULT_SOCKET_FILENAME = ".font-scaler.sock"
+
+COMMAND_BUILD = "build"
+COMMAND_PLAN = "plan"
+COMMAND_REPORT = "report"
+COMMAND_PING = "ping"
+COMMAND_SHUTDOWN = "shutdown"
+
+JSON_COMMAND_KEY = "command"
+JSON_OPTIONS_KEY = "options"
+JSON_OK_KEY = "ok"
+JSON_ERROR_KEY = "error"
+JSON_LOG_KEY = "log"
+JSON_OUTPUT_KEY = "output"
+
+SOCKET_ENCODING = "utf-8"
+
+
+# --- Exceptions ---
+
+
+class DaemonError(Exception):
+    """A daemon could not be reached or failed a request."""
+
+    pass
+
+
+# --- Helpers ---
+
+
+def send_request(socket_path, command, options=None):
+    """Send a single request to a running daemon and return its response."""
+    if not hasattr(socket, "AF_UNIX"):
+        raise DaemonError("Daemon mode requires Unix domain sockets.")
+
+    request = {JSON_COMMAND_KEY: command, JSON_OPTIONS_KEY: options or {}}
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            client.sendall((json.dumps(request) + "\n").encode(SOCKET_ENCODING))
+            with client.makefile("r", encoding=SOCKET_ENCODING) as reader:
+                line = reader.readline()
+    except OSError as e:
+        raise DaemonError(f"Cannot reach daemon at '{socket_path}': {e}")
+
+    if not line:
+        raise DaemonError(f"Daemon at '{socket_path}' closed the connection.")
+    return json.loads(line)
@@ -1,14 +1,33 @@
 import dataclasses
+import filecmp
+import fnmatch
 import json
 import os
 import re
+import shutil
+import struct
 import subprocess
 import sys
+import tempfile
 import xml.etree.ElementTree as ET
 
 from collections import defaultdict
 from typing import Optional, Tuple, List
 
+from .cache import FileFingerprints, RenderCache, hash_values
+from .scheduler import (
+    DEFAULT_HISTORY_FILENAME,
+    ConcurrencyGovernor,
+    JobHistory,
+    ToolJob,
+    estimate_render_cost,
+    job_key,
+    run_tool,
+)
+
+# Modules of optional features (glyph cache, chunk merging, PNG optimisation)
+# are imported where they are used, to keep start-up fast.
+
 # --- Configuration Constants ---
 
 DEFAULT_PROJECT_DIR = "."
@@ -26,14 +45,25 @@ DEFAULT_HINTING = "none"
 # New Directory Template: resources-{shape}-{width}x{height}
 TARGET_RESOURCES_DIR_TEMPLATE = "resources-{shape}-{width}x{height}"
 
+# Per-target staging directory, created in the project directory
+STAGING_DIR_PREFIX = ".font-scaler-staging-"
+JOB_DIR_PREFIX = ".job-"
+CHUNK_DIR_PREFIX = ".chunk-"
+RENDER_DIRNAME = ".render"
+
 XML_DEFAULT_CHARSET_NODE = "DefaultCharset"
 XML_FONT_CHARSETS_NODE = "FontCharsets"
 XML_SCREEN_RESOLUTIONS_NODE = "ScreenResolutions"
+XML_VECTOR_FONTS_NODE = "VectorFonts"
 
 JSON_REFERENCE_KEY = "reference"
 JSON_TARGETS_KEY = "targets"
 JSON_RESOLUTION_KEY = "resolution"
 JSON_SHAPE_KEY = "shape"
+JSON_DEVICES_KEY = "devices"
+JSON_VECTOR_FONTS_KEY = "vectorFonts"
+JSON_FACE_KEY = "face"
+JSON_SIZE_KEY = "size"
 JSON_FONT_ID_KEY = "fontId"
 JSON_CHARSET_KEY = "fontCharset"
 
@@ -42,6 +72,7 @@ XML_FONT_NODE_ID_ATTRIBUTE = "id"
 XML_FONT_NODE_FILENAME_ATTRIBUTE = "filename"
 
 XML_JSON_NODE_PATTERN = ".//jsonData"
+XML_JSON_NODE_TAG = "jsonData"
 XML_JSON_NODE_ID_ATTRIBUTE = "id"
 
 XML_ENCODING = "UTF-8"
@@ -53,10 +84,35 @@ FONT_TOOL_SIZE_OPTION = "-s"
 FONT_TOOL_OUTPUT_OPTION = "-o"
 FONT_TOOL_PADDING_OPTION = "-p"
 
+# When the tool has an option reading the charset from a file, charsets longer
+# than this are passed in a file to keep the invocation under argv size limits.
+CHARSET_FILE_THRESHOLD = 1024
+CHARSET_FILENAME = ".charset.txt"
+
 FNT_FILENAME_PARSE_REGEX = r"^(.*)-(\d+)\.fnt$"
 
 DEFAULT_TABLE_FILENAME = "fonts.md"
 
+# Partial report written by each shard: fonts-shard-{index}-of-{count}.json
+PARTIAL_REPORT_FILENAME_TEMPLATE = "fonts-shard-{index}-of-{count}.json"
+SHARD_SPEC_REGEX = r"^\s*(\d+)\s*/\s*(\d+)\s*$"
+
+# sfnt tables the font tool may read kerning pairs from
+KERNING_TABLE_TAGS = (b"kern", b"GPOS")
+SFNT_VERSIONS = (b"\x00\x01\x00\x00", b"OTTO", b"true", b"typ1")
+SFNT_COLLECTION_TAG = b"ttcf"
+SFNT_HEADER_SIZE = 12
+SFNT_TABLE_RECORD_SIZE = 16
+
+JSON_SHARD_KEY = "shard"
+JSON_SHARD_INDEX_KEY = "index"
+JSON_SHARD_COUNT_KEY = "count"
+JSON_TARGET_INDEX_KEY = "index"
+JSON_FONTS_KEY = "fonts"
+JSON_FONT_NAME_KEY = "fontName"
+JSON_FONT_FILENAME_KEY = "filename"
+JSON_REFERENCE_SIZE_KEY = "referenceSize"
+
 
 # --- Exceptions ---
 
@@ -67,6 +123,64 @@ class FontScalerError(Exception):
     pass
 
 
+# --- Helpers ---
+
+
+def parse_shard_spec(spec: str) -> Tuple[int, int]:
+    """Parse a 1-based 'i/N' shard specification into (index, count)."""
+    match = re.match(SHARD_SPEC_REGEX, spec or "")
+    if not match:
+        raise FontScalerError(f"Invalid shard '{spec}' (format 'i/N' required)")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 1 <= index <= count:
+        raise FontScalerError(f"Invalid shard '{spec}': index must be in 1..{count}")
+    return index, count
+
+
+def ttf_has_kerning(ttf_path) -> bool:
+    """
+    Whether a TrueType/OpenType font, or any font of a collection, has a table
+    with kerning pairs. Files that are not sfnt fonts are reported unkerned.
+    """
+    with open(ttf_path, "rb") as f:
+        offsets = [0]
+        if f.read(4) == SFNT_COLLECTION_TAG:
+            f.seek(8)
+            header = f.read(4)
+            if len(header) < 4:
+                return False
+            count = struct.unpack(">I", header)[0]
+            table = f.read(4 * count)
+            offsets = struct.unpack(f">{len(table) // 4}I", table)
+        return any(
+            tag in KERNING_TABLE_TAGS
+            for offset in offsets
+            for tag in _sfnt_table_tags(f, offset)
+        )
+
+
+def _sfnt_table_tags(f, offset):
+    f.seek(offset)
+    header = f.read(SFNT_HEADER_SIZE)
+    if len(header) < SFNT_HEADER_SIZE or header[:4] not in SFNT_VERSIONS:
+        return []
+    num_tables = struct.unpack(">H", header[4:6])[0]
+    directory = f.read(num_tables * SFNT_TABLE_RECORD_SIZE)
+    return [
+        directory[i : i + 4]
+        for i in range(
+            0, len(directory) - SFNT_TABLE_RECORD_SIZE + 1, SFNT_TABLE_RECORD_SIZE
+        )
+    ]
+
+
+def split_patterns(patterns):
+    """Accept a comma-separated string or a list of glob patterns."""
+    if isinstance(patterns, str):
+        patterns = patterns.split(",")
+    return [pattern.strip() for pattern in patterns if pattern.strip()]
+
+
 # --- Data Structures ---
 
 
@@ -87,12 +201,26 @@ class ScreenConfig:
     width: int
     height: int
     shape: str
+    devices: Tuple[str, ...] = ()
+    # Devices that draw scalable vector fonts need no bitmap fonts
+    vector_fonts: bool = False
 
     @property
     def key(self):
         return f"{self.shape}-{self.width}x{self.height}"
 
 
+@dataclasses.dataclass
+class TargetBuild:
+    config: ScreenConfig
+    target_dir: str
+    staging_dir: str
+    tree: ET.ElementTree
+    jobs: List[ToolJob] = dataclasses.field(default_factory=list)
+    # Directories of chunked renders, merged once all their chunks are done
+    chunk_groups: List[str] = dataclasses.field(default_factory=list)
+
+
 # --- Core Logic ---
 
 
@@ -104,6 +232,14 @@ class FontProcessor:
         self.xml_file_name = DEFAULT_XML_FILENAME
         self.font_tool_path = DEFAULT_TOOL_PATH
         self.font_tool_padding = None
+        self.charset_file_option = None
+        self.max_workers = None
+        self.memory_limit = None
+        self.history_filename = DEFAULT_HISTORY_FILENAME
+        self.optimize_png = False
+        self.chunk_size = None
+        self.use_glyph_cache = False
+        self.glyph_cache = None
 
         self.resources_fonts_path = ""
         self.xml_file_path = ""
@@ -120,6 +256,22 @@ class FontProcessor:
 
         self.table_filename = None
 
+        self.files_changed = 0
+        self.files_staged = 0
+        # Files written or confirmed up to date by the last build
+        self.output_paths = []
+
+        # Files read by parse_source_xml, for change detection by callers
+        self.source_paths: List[str] = []
+        self.fingerprints: Optional[FileFingerprints] = None
+        self.render_cache: Optional[RenderCache] = None
+
+        self.target_filter: List[str] = []
+        self.font_filter: List[str] = []
+
+        self.shard: Optional[Tuple[int, int]] = None
+        self.partial_report_filename = None
+
     def with_project_dir(self, project_dir=None):
         if project_dir:
             self.project_dir = project_dir
@@ -161,10 +313,81 @@ class FontProcessor:
             self.font_tool_padding = font_tool_padding
         return self
 
+    def with_charset_file_option(self, charset_file_option=None):
+        """Pass long charsets to the tool in a file, through this option."""
+        if charset_file_option:
+            self.charset_file_option = charset_file_option
+        return self
+
+    def with_max_workers(self, max_workers=None):
+        if max_workers:
+            self.max_workers = max_workers
+        return self
+
+    def with_memory_limit(self, memory_limit_mb=None):
+        if memory_limit_mb:
+            self.memory_limit = memory_limit_mb * 1024
+        return self
+
+    def with_history_filename(self, history_filename=None):
+        if history_filename:
+            self.history_filename = history_filename
+        return self
+
+    def with_render_cache(self, render_cache=None, fingerprints=None):
+        """Reuse font tool outputs whose inputs are unchanged."""
+        if render_cache is not None:
+            self.render_cache = render_cache
+            self.fingerprints = fingerprints or FileFingerprints()
+        return self
+
+    def with_png_optimization(self, optimize_png=None):
+        if optimize_png:
+            self.optimize_png = True
+        return self
+
+    def with_chunk_size(self, chunk_size=None):
+        """Render charsets longer than chunk_size in parallel chunks."""
+        if chunk_size is not None:
+            if chunk_size < 1:
+                raise FontScalerError(
+                    f"Invalid chunk size {chunk_size}: must be at least 1"
+                )
+            self.chunk_size = chunk_size
+        return self
+
+    def with_glyph_cache(self, use_glyph_cache=None):
+        """Render only glyphs missing from the on-disk glyph cache."""
+        if use_glyph_cache:
+            self.use_glyph_cache = True
+        return self
+
     def with_table_filename(self, table_filename=None):
         self.table_filename = table_filename
         return self
 
+    def with_target_filter(self, patterns=None):
+        """Limit builds to targets whose key or device id matches a glob."""
+        if patterns:
+            self.target_filter = split_patterns(patterns)
+        return self
+
+    def with_font_filter(self, patterns=None):
+        """Limit builds to fonts whose id, TTF filename or name matches a glob."""
+        if patterns:
+            self.font_filter = split_patterns(patterns)
+        return self
+
+    def with_shard(self, shard=None):
+        if shard:
+            self.shard = parse_shard_spec(shard) if isinstance(shard, str) else shard
+        return self
+
+    def with_partial_report_filename(self, partial_report_filename=None):
+        if partial_report_filename:
+            self.partial_report_filename = partial_report_filename
+        return self
+
     def _load_json_data(self, node: ET.Element):
         """
         Helper to load JSON data from a jsonData node.
@@ -182,6 +405,7 @@ class FontProcessor:
 
             if not os.path.exists(json_path):
                 raise FontScalerError(f"External JSON file not found: {json_path}")
+            self.source_paths.append(json_path)
 
             try:
                 with open(json_path, "r", encoding="utf-8") as f:
@@ -201,6 +425,7 @@ class FontProcessor:
         if not os.path.exists(self.xml_file_path):
             raise FontScalerError(f"Font xml file '{self.xml_file_path}' not found.")
 
+        self.source_paths = [self.xml_file_path]
         try:
             tree = ET.parse(self.xml_file_path)
             root = tree.getroot()
@@ -239,6 +464,8 @@ class FontProcessor:
                         width=target[JSON_RESOLUTION_KEY][0],
                         height=target[JSON_RESOLUTION_KEY][1],
                         shape=target[JSON_SHAPE_KEY],
+                        devices=tuple(target.get(JSON_DEVICES_KEY, [])),
+                        vector_fonts=bool(target.get(JSON_VECTOR_FONTS_KEY, False)),
                     )
                 )
 
@@ -317,16 +544,355 @@ class FontProcessor:
         self._info(f"* Project directory: {os.path.abspath(self.project_dir)}")
         self._info(f"* Reference: {self.reference_config}")
         self._info(f"* Targets: {len(self.target_configs)} configurations")
+        target_indices = self._selected_target_indices()
+        if self.target_filter or self.font_filter:
+            self._info(
+                f"* Selected: {len(target_indices)} configurations, "
+                f"{len(self._selected_font_tasks())} of {len(self.font_tasks)} fonts"
+            )
+        if self.shard:
+            self._info(
+                f"* Shard: {self.shard[0]}/{self.shard[1]} "
+                f"({len(target_indices)} configurations)"
+            )
         self._info("Starting batch processing...")
         self._validate_sources()
 
-        for config in self.target_configs:
-            self._process_resolution(config)
+        self.files_changed = 0
+        self.files_staged = 0
+
+        self.output_paths = []
+
+        self.glyph_cache = None
+        if self.use_glyph_cache:
+            from .glyphs import GLYPH_CACHE_DIRNAME, GlyphCache
+
+            self.glyph_cache = GlyphCache(
+                os.path.join(self.project_dir, GLYPH_CACHE_DIRNAME)
+            )
+            self.fingerprints = self.fingerprints or FileFingerprints()
+
+        target_builds = []
+        try:
+            for index in target_indices:
+                target_config = self.target_configs[index]
+                self._info(f"Processing target: {target_config.key}")
+                target_builds.append(self._prepare_resolution(target_config))
 
-        if self.table_filename:
+            self._run_jobs([job for build in target_builds for job in build.jobs])
+
+            for target_build in target_builds:
+                self._merge_chunked_renders(target_build)
+
+            if self.optimize_png:
+                self._optimize_png_pages(target_builds)
+
+            for target_build in target_builds:
+                self._finalize_resolution(target_build)
+        finally:
+            for target_build in target_builds:
+                shutil.rmtree(target_build.staging_dir, ignore_errors=True)
+
+        if self.shard:
+            self._write_partial_report(target_indices)
+        elif self.table_filename:
             self._generate_markdown_report()
 
-        self._info("Batch processing complete.")
+        self._info(
+            f"Batch processing complete: {self.files_changed} of "
+            f"{self.files_staged} file(s) changed."
+        )
+
+    def input_paths(self):
+        """Files a build reads: the parsed sources and the TTFs of all fonts."""
+        ttf_paths = sorted(
+            set(
+                os.path.join(self.resources_fonts_path, task.ttf_filename)
+                for task in self.font_tasks
+            )
+        )
+        return self.source_paths + ttf_paths
+
+    def plan(self):
+        """
+        Describe the font tool invocations a build would make, per target,
+        without rendering anything.
+        """
+        plan = []
+        for index in self._selected_target_indices():
+            target_config = self.target_configs[index]
+            batches = [
+                (ttf_filename, charset, sorted(set(t.target_size for t in tasks)))
+                for (ttf_filename, charset), tasks in self._work_batches(
+                    target_config
+                ).items()
+            ]
+            plan.append((target_config, batches))
+        return plan
+
+    def write_plan(self, file=None):
+        file = file or sys.stdout
+        for target_config, batches in self.plan():
+            file.write(f"{target_config.key}\n")
+            if target_config.vector_fonts:
+                file.write(f"    vector fonts: {len(self.font_tasks)} font(s)\n")
+            for ttf_filename, charset, sizes in batches:
+                size_list = ",".join(map(str, sizes))
+                chunks = len(self._split_charset(ttf_filename, charset))
+                chunk_note = f", {chunks} chunks" if chunks > 1 else ""
+                file.write(
+                    f"    {ttf_filename}: {len(charset)} glyph(s), "
+                    f"size(s) {size_list}{chunk_note}\n"
+                )
+        return self
+
+    def _selected_target_indices(self):
+        target_indices = [
+            i
+            for i, config in enumerate(self.target_configs)
+            if self._matches_target_filter(config)
+        ]
+        if not target_indices:
+            patterns = ", ".join(self.target_filter)
+            raise FontScalerError(f"No targets match '{patterns}'.")
+        if self.shard:
+            return self._select_shard_targets(target_indices)
+        return target_indices
+
+    def _matches_target_filter(self, config: ScreenConfig):
+        if not self.target_filter:
+            return True
+        names = [config.key] + list(config.devices)
+        return any(
+            fnmatch.fnmatchcase(name, pattern)
+            for name in names
+            for pattern in self.target_filter
+        )
+
+    def _selected_font_tasks(self):
+        if not self.font_filter:
+            return self.font_tasks
+        font_tasks = [
+            task
+            for task in self.font_tasks
+            if any(
+                fnmatch.fnmatchcase(name, pattern)
+                for name in (task.font_id, task.ttf_filename, task.font_name)
+                for pattern in self.font_filter
+            )
+        ]
+        if not font_tasks:
+            patterns = ", ".join(self.font_filter)
+            raise FontScalerError(f"No fonts match '{patterns}'.")
+        return font_tasks
+
+    def _work_batches(self, target_config: ScreenConfig):
+        """
+        Group the selected font tasks, scaled to a target, by
+        (TTF filename, charset).
+        """
+        work_batches = defaultdict(list)
+        if target_config.vector_fonts:
+            return work_batches
+        for task in self._selected_font_tasks():
+            target_size = self._calculate_size(task.reference_size, target_config)
+            task = dataclasses.replace(task, target_size=target_size)
+            work_batches[(task.ttf_filename, task.charset)].append(task)
+        return work_batches
+
+    def _run_jobs(self, jobs):
+        history = JobHistory(os.path.join(self.project_dir, self.history_filename))
+        governor = ConcurrencyGovernor(
+            history.load(), self.max_workers, self.memory_limit
+        )
+        try:
+            governor.run(jobs, self._run_font_tool)
+        finally:
+            try:
+                history.save()
+            except IOError as e:
+                self._warn(f"Failed to save job history to {history.path}: {e}")
+
+    def _optimize_png_pages(self, target_builds):
+        from .pngopt import PNG_CACHE_DIRNAME, PNG_EXTENSION, PngOptimizer
+
+        optimizer = PngOptimizer(
+            os.path.join(self.project_dir, PNG_CACHE_DIRNAME), self.max_workers
+        )
+        png_paths = {
+            target_build.config.key: [
+                os.path.join(target_build.staging_dir, filename)
+                for filename in sorted(os.listdir(target_build.staging_dir))
+                if filename.lower().endswith(PNG_EXTENSION)
+            ]
+            for target_build in target_builds
+        }
+        sizes = optimizer.optimize_files(
+            [path for paths in png_paths.values() for path in paths]
+        )
+        for target_key, paths in png_paths.items():
+            original = sum(sizes[path][0] for path in paths)
+            optimized = sum(sizes[path][1] for path in paths)
+            self._info(
+                f"Target {target_key}: PNG pages {original} -> {optimized} bytes "
+                f"({original - optimized} saved)"
+            )
+
+    def _estimate_target_cost(self, target_config: ScreenConfig):
+        return sum(
+            estimate_render_cost(charset, set(task.target_size for task in tasks))
+            for (_, charset), tasks in self._work_batches(target_config).items()
+        )
+
+    def _select_shard_targets(self, target_indices):
+        """
+        Deterministically partition the given target configurations across
+        shards and return the indices of the targets assigned to this shard.
+        Targets are assigned longest-first to the least loaded shard, so every
+        shard computes the same partition and the load is balanced by cost.
+        """
+        index, count = self.shard
+        costs = {
+            i: self._estimate_target_cost(self.target_configs[i])
+            for i in target_indices
+        }
+        order = sorted(
+            target_indices,
+            key=lambda i: (-costs[i], self.target_configs[i].key, i),
+        )
+        loads = [0] * count
+        assigned = []
+        for i in order:
+            shard = min(range(count), key=lambda s: (loads[s], s))
+            loads[shard] += costs[i]
+            if shard == index - 1:
+                assigned.append(i)
+        return sorted(assigned)
+
+    def _write_partial_report(self, target_indices):
+        index, count = self.shard
+        filename = self.partial_report_filename or (
+            PARTIAL_REPORT_FILENAME_TEMPLATE.format(index=index, count=count)
+        )
+        partial_path = os.path.join(self.project_dir, filename)
+        data = {
+            JSON_SHARD_KEY: {JSON_SHARD_INDEX_KEY: index, JSON_SHARD_COUNT_KEY: count},
+            JSON_REFERENCE_KEY: self._config_to_json(self.reference_config),
+            JSON_TARGETS_KEY: [
+                dict(
+                    self._config_to_json(self.target_configs[i]),
+                    **{JSON_TARGET_INDEX_KEY: i},
+                )
+                for i in target_indices
+            ],
+            JSON_FONTS_KEY: [
+                {
+                    JSON_FONT_ID_KEY: task.font_id,
+                    JSON_FONT_NAME_KEY: task.font_name,
+                    JSON_FONT_FILENAME_KEY: task.fnt_filename,
+                    JSON_REFERENCE_SIZE_KEY: task.reference_size,
+                }
+                for task in self.font_tasks
+            ],
+        }
+        self._info(f"Writing partial report: {partial_path}")
+        try:
+            with open(partial_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+        except IOError as e:
+            raise FontScalerError(
+                f"Failed to write partial report to {partial_path}: {e}"
+            )
+
+    def load_partial_reports(self, partial_paths):
+        """
+        Combine partial reports written by sharded runs, restoring the
+        reference, target and font state needed to generate the full report.
+        """
+        partials = []
+        for path in partial_paths:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    partials.append(json.load(f))
+            except (IOError, json.JSONDecodeError) as e:
+                raise FontScalerError(f"Failed to read partial report '{path}': {e}")
+
+        if not partials:
+            raise FontScalerError("No partial reports to merge.")
+
+        first = partials[0]
+        count = None
+        seen_shards = set()
+        targets = {}
+        for path, partial in zip(partial_paths, partials):
+            try:
+                shard = partial[JSON_SHARD_KEY]
+                if count is None:
+                    count = shard[JSON_SHARD_COUNT_KEY]
+                if shard[JSON_SHARD_COUNT_KEY] != count:
+                    raise FontScalerError(
+                        f"Partial report '{path}' belongs to a "
+                        f"{shard[JSON_SHARD_COUNT_KEY]}-shard build, expected {count}."
+                    )
+                if (
+                    partial[JSON_REFERENCE_KEY] != first[JSON_REFERENCE_KEY]
+                    or partial[JSON_FONTS_KEY] != first[JSON_FONTS_KEY]
+                ):
+                    raise FontScalerError(
+                        f"Partial report '{path}' was built from a different "
+                        "configuration."
+                    )
+                seen_shards.add(shard[JSON_SHARD_INDEX_KEY])
+                for target in partial[JSON_TARGETS_KEY]:
+                    targets[target[JSON_TARGET_INDEX_KEY]] = self._config_from_json(
+                        target
+                    )
+                if partial is first:
+                    reference_config = self._config_from_json(first[JSON_REFERENCE_KEY])
+                    font_tasks = [
+                        FontTask(
+                            xml_node=None,
+                            font_id=font[JSON_FONT_ID_KEY],
+                            font_name=font[JSON_FONT_NAME_KEY],
+                            fnt_filename=font[JSON_FONT_FILENAME_KEY],
+                            ttf_filename=f"{font[JSON_FONT_NAME_KEY]}.ttf",
+                            reference_size=font[JSON_REFERENCE_SIZE_KEY],
+                            target_size=None,
+                            charset="",
+                        )
+                        for font in first[JSON_FONTS_KEY]
+                    ]
+            except (KeyError, TypeError):
+                raise FontScalerError(f"'{path}' is not a partial report")
+
+        missing = sorted(set(range(1, count + 1)) - seen_shards)
+        if missing:
+            shard_list = ", ".join(f"{i}/{count}" for i in missing)
+            raise FontScalerError(
+                f"Missing partial report(s) for shard(s): {shard_list}"
+            )
+
+        self.reference_config = reference_config
+        self.target_configs = [targets[i] for i in sorted(targets)]
+        self.font_tasks = font_tasks
+        return self
+
+    def write_report(self):
+        self._generate_markdown_report()
+        return self
+
+    def _config_to_json(self, config: ScreenConfig):
+        return {
+            JSON_RESOLUTION_KEY: [config.width, config.height],
+            JSON_SHAPE_KEY: config.shape,
+        }
+
+    def _config_from_json(self, data):
+        return ScreenConfig(
+            width=data[JSON_RESOLUTION_KEY][0],
+            height=data[JSON_RESOLUTION_KEY][1],
+            shape=data[JSON_SHAPE_KEY],
+        )
 
     def _validate_sources(self):
         missing = []
@@ -341,71 +907,399 @@ class FontProcessor:
             message = f"Missing {len(missing)} Source TTF File(s): {file_list}"
             raise FontScalerError(message)
 
-    def _process_resolution(self, target_config: ScreenConfig):
-        self._info(f"Processing target: {target_config.key}")
-        target_dir, target_xml = self._prepare_target(target_config)
+    def _prepare_resolution(self, target_config: ScreenConfig):
+        """
+        Plan the tool jobs for one target and point its fonts.xml entries at
+        the scaled .fnt files. Jobs render into a staging directory, so that
+        unchanged outputs keep their mtimes and do not trigger resource
+        rebuilds downstream.
+        """
+        target_dir, target_tree = self._prepare_target(target_config)
 
-        target_tree = ET.parse(target_xml)
         target_root = target_tree.getroot()
         target_node_map = {
             node.get(XML_FONT_NODE_ID_ATTRIBUTE): node
             for node in target_root.findall(XML_FONT_NODE_PATTERN)
         }
 
-        work_batches = defaultdict(list)
+        staging_dir = tempfile.mkdtemp(prefix=STAGING_DIR_PREFIX, dir=self.project_dir)
+        target_build = TargetBuild(
+            config=target_config,
+            target_dir=target_dir,
+            staging_dir=staging_dir,
+            tree=target_tree,
+        )
+
+        if target_config.vector_fonts:
+            self._map_vector_fonts(target_root, target_config)
+            return target_build
+
+        work_batches = self._work_batches(target_config)
+
+        for job_index, ((ttf_filename, charset), tasks) in enumerate(
+            work_batches.items()
+        ):
+            unique_sizes = sorted(list(set(task.target_size for task in tasks)))
+            # Each job renders into its own directory, so that its outputs can
+            # be cached before they are moved into the parent directory.
+            job_dir = os.path.join(staging_dir, f"{JOB_DIR_PREFIX}{job_index}")
+            chunks = self._split_charset(ttf_filename, charset)
+            if len(chunks) == 1:
+                target_build.jobs.append(
+                    self._tool_job(ttf_filename, charset, unique_sizes, job_dir)
+                )
+                continue
+
+            # Chunks are collected in separate directories of the job and
+            # merged into the staging area after all of them have rendered.
+            target_build.chunk_groups.append(job_dir)
+            for chunk_index, chunk in enumerate(chunks):
+                output_dir = os.path.join(
+                    job_dir, f"{CHUNK_DIR_PREFIX}{chunk_index}", RENDER_DIRNAME
+                )
+                target_build.jobs.append(
+                    self._tool_job(ttf_filename, chunk, unique_sizes, output_dir)
+                )
+
+        # Every font entry points at its scaled file, including fonts excluded
+        # by a font filter, whose previously generated files are kept.
         for task in self.font_tasks:
             target_size = self._calculate_size(task.reference_size, target_config)
-            task = dataclasses.replace(task, target_size=target_size)
-            work_batches[(task.ttf_filename, task.charset)].append(task)
+            new_filename = f"{task.font_name}-{target_size}.fnt"
+            if task.font_id in target_node_map:
+                node = target_node_map[task.font_id]
+                node.set(XML_FONT_NODE_FILENAME_ATTRIBUTE, new_filename)
 
-        for (ttf_filename, charset), tasks in work_batches.items():
-            source_ttf_path = os.path.join(self.resources_fonts_path, ttf_filename)
-            unique_sizes = sorted(list(set(task.target_size for task in tasks)))
-            size_argument = ",".join(map(str, unique_sizes))
-
-            font_tool_command = [
-                self.font_tool_path,
-                FONT_TOOL_SOURCE_TTF_OPTION,
-                source_ttf_path,
-                FONT_TOOL_CHARSET_OPTION,
-                charset,
-                FONT_TOOL_HINTING_OPTION,
-                DEFAULT_HINTING,
-                FONT_TOOL_SIZE_OPTION,
-                size_argument,
-                FONT_TOOL_OUTPUT_OPTION,
-                target_dir,
+        return target_build
+
+    def _map_vector_fonts(self, target_root, target_config: ScreenConfig):
+        """
+        Replace the bitmap font entries of a target that draws vector fonts
+        with a JSON resource mapping each font id to its face and scaled size.
+        """
+        mapping = {
+            task.font_id: {
+                JSON_FACE_KEY: task.font_name,
+                JSON_SIZE_KEY: self._calculate_size(task.reference_size, target_config),
+            }
+            for task in self.font_tasks
+        }
+
+        parents = {child: parent for parent in target_root.iter() for child in parent}
+        for node in target_root.findall(XML_FONT_NODE_PATTERN):
+            if node.get(XML_FONT_NODE_ID_ATTRIBUTE) not in mapping:
+                continue
+            parent = parents[node]
+            parent.remove(node)
+            if len(parent) == 0 and parent is not target_root:
+                parents[parent].remove(parent)
+
+        json_node = ET.SubElement(
+            target_root,
+            XML_JSON_NODE_TAG,
+            {XML_JSON_NODE_ID_ATTRIBUTE: XML_VECTOR_FONTS_NODE},
+        )
+        json_node.text = json.dumps(mapping)
+        self._info(
+            f"Target {target_config.key}: vector fonts, skipping bitmap rendering"
+        )
+
+    def _tool_job(self, ttf_filename, charset, sizes, output_dir):
+        source_ttf_path = os.path.join(self.resources_fonts_path, ttf_filename)
+        return ToolJob(
+            key=job_key(ttf_filename, charset, sizes),
+            command=self._build_font_tool_command(
+                source_ttf_path, charset, sizes, output_dir
+            ),
+            cost=estimate_render_cost(charset, sizes),
+            ttf_filename=ttf_filename,
+            output_dir=output_dir,
+            source_ttf_path=source_ttf_path,
+            charset=charset,
+            sizes=sizes,
+            cache_key=self._render_cache_key(source_ttf_path, charset, sizes),
+        )
+
+    def _split_charset(self, ttf_filename, charset):
+        """
+        Split a charset longer than the chunk size into near-equal chunks.
+        Fonts that can kern are not split, since chunks cannot render kerning
+        pairs between characters of different chunks.
+        """
+        if not self.chunk_size or len(charset) <= self.chunk_size:
+            return [charset]
+        if ttf_has_kerning(os.path.join(self.resources_fonts_path, ttf_filename)):
+            return [charset]
+        chunk_count = -(-len(charset) // self.chunk_size)
+        length = -(-len(charset) // chunk_count)
+        return [charset[i : i + length] for i in range(0, len(charset), length)]
+
+    def _merge_chunked_renders(self, target_build: TargetBuild):
+        from .bmfont import merge_fonts
+
+        for job_dir in target_build.chunk_groups:
+            chunk_dirs = [
+                os.path.join(job_dir, name)
+                for name in sorted(
+                    os.listdir(job_dir),
+                    key=lambda name: int(name[len(CHUNK_DIR_PREFIX) :]),
+                )
             ]
+            for filename in sorted(os.listdir(chunk_dirs[0])):
+                if not filename.endswith(".fnt"):
+                    continue
+                try:
+                    fnt_text, pages = merge_fonts(
+                        [os.path.join(chunk_dir, filename) for chunk_dir in chunk_dirs],
+                        os.path.splitext(filename)[0],
+                    )
+                except (OSError, ValueError, KeyError) as e:
+                    raise FontScalerError(
+                        f"Failed merging chunked renders of '{filename}': {e}"
+                    )
+                fnt_path = os.path.join(target_build.staging_dir, filename)
+                with open(fnt_path, "w", encoding="utf-8") as f:
+                    f.write(fnt_text)
+                for page_filename, content in pages.items():
+                    page_path = os.path.join(target_build.staging_dir, page_filename)
+                    with open(page_path, "wb") as f:
+                        f.write(content)
+            shutil.rmtree(job_dir)
+
+    def _render_cache_key(self, source_ttf_path, charset, sizes):
+        if self.render_cache is None:
+            return None
+        # Output filenames derive from the TTF name, so identical font files
+        # under different names must not share cached outputs.
+        return hash_values(
+            os.path.basename(source_ttf_path),
+            self.fingerprints.digest(source_ttf_path),
+            charset,
+            sizes,
+            DEFAULT_HINTING,
+            self.font_tool_padding,
+            self.font_tool_path,
+            # Glyph-cache builds reassemble the tool outputs, so they differ
+            self.use_glyph_cache,
+        )
+
+    def _run_font_tool(self, job: ToolJob):
+        """
+        Run one tool job and move its outputs into the target staging area.
+        Returns None when the outputs were served from the render cache.
+        """
+        staging_dir = os.path.dirname(job.output_dir)
+        cached_outputs = None
+        if job.cache_key is not None:
+            cached_outputs = self.render_cache.get(job.cache_key)
+        if cached_outputs is not None:
+            os.makedirs(staging_dir, exist_ok=True)
+            for filename, content in cached_outputs.items():
+                with open(os.path.join(staging_dir, filename), "wb") as f:
+                    f.write(content)
+            return None
 
-            if self.font_tool_padding is not None:
-                font_tool_command.extend(
-                    [FONT_TOOL_PADDING_OPTION, str(self.font_tool_padding)]
+        # Pairs between new and cached glyphs would be lost, so fonts that can
+        # kern bypass the glyph cache
+        if self.glyph_cache is not None and not ttf_has_kerning(job.source_ttf_path):
+            tool_run = self._render_with_glyph_cache(job)
+        else:
+            tool_run = self._render(job, job.charset)
+
+        outputs = {}
+        for filename in sorted(os.listdir(job.output_dir)):
+            output_path = os.path.join(job.output_dir, filename)
+            if job.cache_key is not None:
+                with open(output_path, "rb") as f:
+                    outputs[filename] = f.read()
+            os.replace(output_path, os.path.join(staging_dir, filename))
+        os.rmdir(job.output_dir)
+        if job.cache_key is not None:
+            self.render_cache.put(job.cache_key, outputs)
+        return tool_run
+
+    def _render(self, job: ToolJob, charset):
+        """Render a charset, which may be a subset of the job's, for a job."""
+        command = job.command
+        if charset != job.charset:
+            command = self._build_font_tool_command(
+                job.source_ttf_path, charset, job.sizes, job.output_dir
+            )
+        shutil.rmtree(job.output_dir, ignore_errors=True)
+        os.makedirs(job.output_dir)
+        charset_path = self._charset_file_path(charset, job.output_dir)
+        if charset_path:
+            with open(charset_path, "w", encoding="utf-8") as f:
+                f.write(charset)
+        try:
+            return run_tool(command)
+        except subprocess.CalledProcessError as e:
+            raise FontScalerError(
+                f"Failed processing TTF file '{job.ttf_filename}': {e}"
+            )
+        except FileNotFoundError:
+            raise FontScalerError(
+                f"font processing tool '{self.font_tool_path}' not found."
+            )
+        finally:
+            if charset_path and os.path.exists(charset_path):
+                os.remove(charset_path)
+
+    def _charset_file_path(self, charset, output_dir):
+        if not self.charset_file_option or len(charset) <= CHARSET_FILE_THRESHOLD:
+            return None
+        return os.path.join(output_dir, CHARSET_FILENAME)
+
+    def _render_with_glyph_cache(self, job: ToolJob):
+        """
+        Render only the glyphs missing from the glyph cache, then reassemble
+        every size of the job from cached glyph bitmaps.
+        Fonts whose renders turn out to have kerning pairs anyway are marked
+        kerned in the cache and rendered in full from then on.
+        Returns None when no rendering was needed.
+        """
+        from .glyphs import GlyphSet
+
+        ttf_digest = self.fingerprints.digest(job.source_ttf_path)
+        font_name = os.path.splitext(job.ttf_filename)[0]
+        codepoints = sorted(set(ord(char) for char in job.charset))
+        keys = {
+            size: self.glyph_cache.key(
+                ttf_digest, size, self.font_tool_padding, DEFAULT_HINTING
+            )
+            for size in job.sizes
+        }
+        glyph_sets = {size: self.glyph_cache.load(key) for size, key in keys.items()}
+        if any(glyph_set and glyph_set.kerned for glyph_set in glyph_sets.values()):
+            return self._render(job, job.charset)
+
+        incremental = all(glyph_set is not None for glyph_set in glyph_sets.values())
+        missing = sorted(
+            set(
+                codepoint
+                for glyph_set in glyph_sets.values()
+                for codepoint in (
+                    glyph_set.missing(codepoints) if glyph_set else codepoints
                 )
+            )
+        )
+
+        tool_run = None
+        if missing or not incremental:
+            requested = missing if incremental else codepoints
+            charset = "".join(map(chr, requested)) if incremental else job.charset
+            tool_run = self._render(job, charset)
 
             try:
-                subprocess.run(
-                    font_tool_command,
-                    check=True,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                )
-                for task in tasks:
-                    new_filename = f"{task.font_name}-{task.target_size}.fnt"
-                    if task.font_id in target_node_map:
-                        node = target_node_map[task.font_id]
-                        node.set(XML_FONT_NODE_FILENAME_ATTRIBUTE, new_filename)
+                for size in job.sizes:
+                    stem = f"{font_name}-{size}"
+                    glyph_set = glyph_sets[size] or GlyphSet(
+                        info={}, common={}, page_suffix="", kerned=False
+                    )
+                    glyph_sets[size] = glyph_set.harvest(
+                        os.path.join(job.output_dir, f"{stem}.fnt"), stem, requested
+                    )
+            except (OSError, ValueError, KeyError) as e:
+                self._warn(f"Glyph cache skipped for '{job.ttf_filename}': {e}")
+                if incremental:
+                    return self._render(job, job.charset)
+                return tool_run
 
-            except subprocess.CalledProcessError as e:
-                raise FontScalerError(
-                    f"Failed processing TTF file '{ttf_filename}': {e}"
-                )
-            except FileNotFoundError:
-                raise FontScalerError(
-                    f"font processing tool '{self.font_tool_path}' not found."
-                )
+            for size, glyph_set in glyph_sets.items():
+                glyph_sets[size] = self.glyph_cache.update(keys[size], glyph_set)
 
-        self._pretty_print_xml(target_tree)
-        target_tree.write(target_xml, encoding=XML_ENCODING, xml_declaration=True)
+            if any(glyph_set.kerned for glyph_set in glyph_sets.values()):
+                if incremental:
+                    return self._render(job, job.charset)
+                return tool_run
+
+        try:
+            assembled = {
+                size: glyph_set.assemble(f"{font_name}-{size}", codepoints)
+                for size, glyph_set in glyph_sets.items()
+            }
+        except ValueError as e:
+            self._warn(f"Glyph cache skipped for '{job.ttf_filename}': {e}")
+            if tool_run is not None and not incremental:
+                return tool_run  # the full render's outputs are still in place
+            return self._render(job, job.charset)
+
+        shutil.rmtree(job.output_dir, ignore_errors=True)
+        os.makedirs(job.output_dir)
+        for size, (fnt_text, pages) in assembled.items():
+            fnt_path = os.path.join(job.output_dir, f"{font_name}-{size}.fnt")
+            with open(fnt_path, "w", encoding="utf-8") as f:
+                f.write(fnt_text)
+            for filename, content in pages.items():
+                with open(os.path.join(job.output_dir, filename), "wb") as f:
+                    f.write(content)
+        return tool_run
+
+    def _finalize_resolution(self, target_build: TargetBuild):
+        self._pretty_print_xml(target_build.tree)
+        target_build.tree.write(
+            os.path.join(target_build.staging_dir, DEFAULT_XML_FILENAME),
+            encoding=XML_ENCODING,
+            xml_declaration=True,
+        )
+        changed, total = self._commit_staged_outputs(
+            target_build.staging_dir, target_build.target_dir
+        )
+        self.files_changed += changed
+        self.files_staged += total
+        self._info(
+            f"Target {target_build.config.key}: updated {changed} of {total} file(s)"
+        )
+
+    def _build_font_tool_command(self, source_ttf_path, charset, sizes, output_dir):
+        charset_path = self._charset_file_path(charset, output_dir)
+        if charset_path:
+            charset_option = [self.charset_file_option, charset_path]
+        else:
+            charset_option = [FONT_TOOL_CHARSET_OPTION, charset]
+        font_tool_command = [
+            self.font_tool_path,
+            FONT_TOOL_SOURCE_TTF_OPTION,
+            source_ttf_path,
+            *charset_option,
+            FONT_TOOL_HINTING_OPTION,
+            DEFAULT_HINTING,
+            FONT_TOOL_SIZE_OPTION,
+            ",".join(map(str, sizes)),
+            FONT_TOOL_OUTPUT_OPTION,
+            output_dir,
+        ]
+
+        if self.font_tool_padding is not None:
+            font_tool_command.extend(
+                [FONT_TOOL_PADDING_OPTION, str(self.font_tool_padding)]
+            )
+        return font_tool_command
+
+    def _commit_staged_outputs(self, staging_dir, target_dir):
+        """
+        Move staged files into the target directory, replacing only files whose
+        content differs. Returns the number of changed and staged files.
+        """
+        changed = 0
+        total = 0
+        for dir_path, _, filenames in os.walk(staging_dir):
+            relative_dir = os.path.relpath(dir_path, staging_dir)
+            for filename in sorted(filenames):
+                total += 1
+                staged_path = os.path.join(dir_path, filename)
+                target_path = os.path.normpath(
+                    os.path.join(target_dir, relative_dir, filename)
+                )
+                self.output_paths.append(target_path)
+                if os.path.isfile(target_path) and filecmp.cmp(
+                    staged_path, target_path, shallow=False
+                ):
+                    continue
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                os.replace(staged_path, target_path)
+                changed += 1
+        return changed, total
 
     def _generate_markdown_report(self):
         seen_keys = {self.reference_config.key}
@@ -424,6 +1318,7 @@ class FontProcessor:
             try:
                 with open(full_table_path, "w", encoding="utf-8") as f:
                     self._write_report_content(f, all_configs)
+                self.output_paths.append(full_table_path)
             except IOError as e:
                 raise FontScalerError(
                     f"Failed to write table to {full_table_path}: {e}"
@@ -551,17 +1446,14 @@ class FontProcessor:
         if not os.path.exists(target_fonts_dir):
             os.makedirs(target_fonts_dir)
 
-        target_xml_path = os.path.join(target_fonts_dir, DEFAULT_XML_FILENAME)
         try:
             tree = ET.parse(self.xml_file_path)
             root = tree.getroot()
             for json_node in root.findall(XML_JSON_NODE_PATTERN):
                 root.remove(json_node)
-            self._pretty_print_xml(tree)
-            tree.write(target_xml_path, encoding=XML_ENCODING, xml_declaration=True)
         except ET.ParseError:
             raise FontScalerError("Error preparing target XML.")
-        return target_fonts_dir, target_xml_path
+        return target_fonts_dir, tree
 
     def _pretty_print_xml(self, tree):
         if hasattr(ET, "indent"):
@@ -0,0 +1,177 @@
+import contextlib
+import copy
+import io
+import json
+import os
+import socket
+import socketserver
+import threading
+
+from .cache import FileFingerprints, RenderCache, stat_key
+from .client import (
+    COMMAND_BUILD,
+    COMMAND_PING,
+    COMMAND_PLAN,
+    COMMAND_REPORT,
+    COMMAND_SHUTDOWN,
+    JSON_COMMAND_KEY,
+    JSON_ERROR_KEY,
+    JSON_LOG_KEY,
+    JSON_OK_KEY,
+    JSON_OPTIONS_KEY,
+    JSON_OUTPUT_KEY,
+    SOCKET_ENCODING,
+    DaemonError,
+    send_request,
+)
+from .core import FontProcessor, FontScalerError
+
+# --- Configuration Constants ---
+
+# Options that determine the parsed source state; everything else is applied
+# per request on a copy of the parsed processor.
+PARSE_OPTIONS = ("project_dir", "resources_dir", "fonts_subdir", "xml_file")
+
+
+# --- Core Logic ---
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline().decode(SOCKET_ENCODING)
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = {JSON_OK_KEY: False, JSON_ERROR_KEY: f"Invalid request: {e}"}
+        else:
+            response = self.server.font_scaler_daemon.handle_request(request)
+        self.wfile.write((json.dumps(response) + "\n").encode(SOCKET_ENCODING))
+
+
+class FontScalerDaemon:
+    """
+    Long-lived server answering build, plan and report requests over a Unix
+    domain socket. Parsed sources, TTF fingerprints and font tool outputs are
+    kept in memory between requests; parsed sources are re-read whenever one
+    of their files changes, and cached renders are keyed by content digests.
+    """
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.fingerprints = FileFingerprints()
+        self.render_cache = RenderCache()
+        # Parsed processors, with the stat snapshot of their source files
+        self._parsed = {}
+        self._server = None
+
+    def serve_forever(self):
+        if not hasattr(socket, "AF_UNIX"):
+            raise FontScalerError("Daemon mode requires Unix domain sockets.")
+
+        if os.path.exists(self.socket_path):
+            try:
+                send_request(self.socket_path, COMMAND_PING)
+            except DaemonError:
+                os.remove(self.socket_path)  # stale socket from a dead daemon
+            else:
+                raise FontScalerError(
+                    f"A daemon is already listening on '{self.socket_path}'."
+                )
+
+        self._server = socketserver.UnixStreamServer(self.socket_path, _RequestHandler)
+        self._server.font_scaler_daemon = self
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def handle_request(self, request):
+        command = request.get(JSON_COMMAND_KEY)
+        options = request.get(JSON_OPTIONS_KEY, {})
+
+        if command == COMMAND_PING:
+            return {JSON_OK_KEY: True}
+        if command == COMMAND_SHUTDOWN:
+            # shutdown() blocks until serve_forever() returns, which cannot
+            # happen while this handler is still running on the same thread.
+            threading.Thread(target=self._server.shutdown).start()
+            return {JSON_OK_KEY: True}
+
+        log = io.StringIO()
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stderr(log), contextlib.redirect_stdout(output):
+                processor = self._processor(options)
+                if command == COMMAND_BUILD:
+                    processor.execute()
+                elif command == COMMAND_PLAN:
+                    processor.write_plan()
+                elif command == COMMAND_REPORT:
+                    if not processor.table_filename:
+                        processor.with_table_filename("-")
+                    processor.write_report()
+                else:
+                    raise FontScalerError(f"Unknown daemon command '{command}'.")
+        except FontScalerError as e:
+            return {
+                JSON_OK_KEY: False,
+                JSON_ERROR_KEY: str(e),
+                JSON_LOG_KEY: log.getvalue(),
+            }
+        except Exception as e:
+            return {
+                JSON_OK_KEY: False,
+                JSON_ERROR_KEY: f"Unexpected Error: {e}",
+                JSON_LOG_KEY: log.getvalue(),
+            }
+        return {
+            JSON_OK_KEY: True,
+            JSON_LOG_KEY: log.getvalue(),
+            JSON_OUTPUT_KEY: output.getvalue(),
+        }
+
+    def _processor(self, options):
+        parse_key = json.dumps([options.get(name) for name in PARSE_OPTIONS])
+        parsed = self._parsed.get(parse_key)
+        if parsed is not None:
+            processor, snapshot = parsed
+            if snapshot != self._snapshot(processor.source_paths):
+                parsed = None
+
+        if parsed is None:
+            processor = (
+                FontProcessor()
+                .with_project_dir(options.get("project_dir"))
+                .with_resources_dir(options.get("resources_dir"))
+                .with_fonts_subdir(options.get("fonts_subdir"))
+                .with_xml_file_name(options.get("xml_file"))
+                .parse_source_xml()
+            )
+            self._parsed[parse_key] = (
+                processor,
+                self._snapshot(processor.source_paths),
+            )
+
+        return (
+            copy.copy(processor)
+            .with_font_tool_path(options.get("tool_path"))
+            .with_font_tool_padding(options.get("padding"))
+            .with_charset_file_option(options.get("charset_file_option"))
+            .with_max_workers(options.get("jobs"))
+            .with_memory_limit(options.get("memory_limit"))
+            .with_history_filename(options.get("history_file"))
+            .with_png_optimization(options.get("optimize_png"))
+            .with_chunk_size(options.get("chunk_size"))
+            .with_glyph_cache(options.get("glyph_cache"))
+            .with_table_filename(options.get("table"))
+            .with_target_filter(options.get("only_targets"))
+            .with_font_filter(options.get("only_fonts"))
+            .with_shard(options.get("shard"))
+            .with_partial_report_filename(options.get("partial_report"))
+            .with_render_cache(self.render_cache, self.fingerprints)
+        )
+
+    def _snapshot(self, paths):
+        return [(path, stat_key(path)) for path in paths]
@@ -0,0 +1,184 @@
+import base64
+import dataclasses
+import json
+import os
+import tempfile
+import threading
+import zlib
+
+from typing import Dict, Optional
+
+from .bmfont import BitmapFont, Glyph, assemble_font, read_font
+from .cache import hash_values
+
+# --- Configuration Constants ---
+
+GLYPH_CACHE_DIRNAME = os.path.join(".font-scaler-cache", "glyphs")
+GLYPH_CACHE_VERSION = 1
+
+JSON_VERSION_KEY = "version"
+JSON_INFO_KEY = "info"
+JSON_COMMON_KEY = "common"
+JSON_PAGE_SUFFIX_KEY = "pageSuffix"
+JSON_KERNED_KEY = "kerned"
+JSON_GLYPHS_KEY = "glyphs"
+JSON_PIXELS_KEY = "pixels"
+
+PAGE_SIZE_KEYS = ("scaleW", "scaleH")
+
+
+# --- Helpers ---
+
+
+def widest_pages(common, other_common):
+    """Common attributes with the larger page size of two renders."""
+    common = dict(common)
+    for name in PAGE_SIZE_KEYS:
+        if name in other_common:
+            common[name] = str(max(int(common.get(name, 0)), int(other_common[name])))
+    return common
+
+
+# --- Data Structures ---
+
+
+@dataclasses.dataclass
+class GlyphSet:
+    """
+    Cached glyphs of one TTF rendered at one size with one set of options.
+    A codepoint mapped to None was requested but is absent from the TTF.
+    """
+
+    info: Dict[str, str]
+    common: Dict[str, str]
+    # First page filename without the '<font-name>-<size>' stem
+    page_suffix: str
+    kerned: bool
+    glyphs: Dict[int, Optional[Glyph]] = dataclasses.field(default_factory=dict)
+
+    def missing(self, codepoints):
+        return [codepoint for codepoint in codepoints if codepoint not in self.glyphs]
+
+    def harvest(self, fnt_path, stem, codepoints):
+        """Add the glyphs of a rendered font, which was asked for codepoints."""
+        font, glyphs = read_font(fnt_path)
+        # A partial render may use smaller pages than cached glyphs need
+        self.info = font.info
+        self.common = widest_pages(font.common, self.common)
+        first_page = font.pages.get(0, "")
+        if first_page.startswith(stem):
+            self.page_suffix = first_page[len(stem) :]
+        self.kerned = self.kerned or bool(font.kernings)
+        for codepoint in codepoints:
+            self.glyphs[codepoint] = glyphs.get(codepoint)
+        return self
+
+    def merge(self, other: "GlyphSet"):
+        """Add the glyphs of another set for the same key that this one lacks."""
+        for codepoint, glyph in other.glyphs.items():
+            self.glyphs.setdefault(codepoint, glyph)
+        self.common = widest_pages(self.common, other.common)
+        self.page_suffix = self.page_suffix or other.page_suffix
+        self.kerned = self.kerned or other.kerned
+        return self
+
+    def assemble(self, stem, codepoints):
+        template = BitmapFont(
+            info=self.info,
+            common=self.common,
+            pages={0: stem + self.page_suffix} if self.page_suffix else {},
+            chars={},
+            kernings=[],
+        )
+        glyphs = {
+            codepoint: self.glyphs[codepoint]
+            for codepoint in codepoints
+            if self.glyphs.get(codepoint) is not None
+        }
+        return assemble_font(template, glyphs, stem)
+
+
+# --- Core Logic ---
+
+
+class GlyphCache:
+    """
+    On-disk cache of rendered glyph bitmaps, one file per TTF content, size,
+    padding and hinting, holding the glyphs of every codepoint rendered so far.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def key(self, ttf_digest, size, padding, hinting):
+        return hash_values(GLYPH_CACHE_VERSION, ttf_digest, size, padding, hinting)
+
+    def load(self, key) -> Optional[GlyphSet]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get(JSON_VERSION_KEY) != GLYPH_CACHE_VERSION:
+            return None
+        glyphs = {}
+        for codepoint, glyph in data[JSON_GLYPHS_KEY].items():
+            if glyph is not None:
+                pixels = zlib.decompress(base64.b64decode(glyph[JSON_PIXELS_KEY]))
+                glyph = Glyph(**dict(glyph, **{JSON_PIXELS_KEY: pixels}))
+            glyphs[int(codepoint)] = glyph
+        return GlyphSet(
+            info=data[JSON_INFO_KEY],
+            common=data[JSON_COMMON_KEY],
+            page_suffix=data[JSON_PAGE_SUFFIX_KEY],
+            kerned=data[JSON_KERNED_KEY],
+            glyphs=glyphs,
+        )
+
+    def update(self, key, glyph_set: GlyphSet) -> GlyphSet:
+        """
+        Merge a glyph set with the cached set for its key and save the result.
+        Jobs rendering the same TTF at the same size share a key, so the merge
+        runs under a per-key lock to keep their glyphs from overwriting each
+        other.
+        """
+        with self._lock(key):
+            cached = self.load(key)
+            if cached is not None:
+                glyph_set.merge(cached)
+            self.save(key, glyph_set)
+        return glyph_set
+
+    def save(self, key, glyph_set: GlyphSet):
+        glyphs = {}
+        for codepoint, glyph in glyph_set.glyphs.items():
+            if glyph is not None:
+                pixels = base64.b64encode(zlib.compress(glyph.pixels)).decode("ascii")
+                glyph = dict(dataclasses.asdict(glyph), **{JSON_PIXELS_KEY: pixels})
+            glyphs[str(codepoint)] = glyph
+        data = {
+            JSON_VERSION_KEY: GLYPH_CACHE_VERSION,
+            JSON_INFO_KEY: glyph_set.info,
+            JSON_COMMON_KEY: glyph_set.common,
+            JSON_PAGE_SUFFIX_KEY: glyph_set.page_suffix,
+            JSON_KERNED_KEY: glyph_set.kerned,
+            JSON_GLYPHS_KEY: glyphs,
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def _lock(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
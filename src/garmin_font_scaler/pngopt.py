@@ -0,0 +1,305 @@
+import os
+import struct
+import zlib
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from .cache import hash_bytes, hash_values
+
+# --- Configuration Constants ---
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_EXTENSION = ".png"
+PNG_CACHE_DIRNAME = os.path.join(".font-scaler-cache", "png")
+
+# Version of the optimisation strategy; part of the cache key so that cached
+# results are discarded when the strategy changes.
+PNG_OPTIMIZER_VERSION = 1
+
+# Ancillary chunks that carry no pixel data and can be dropped losslessly
+DROPPABLE_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+
+CHANNELS_BY_COLOR_TYPE = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+FILTER_NONE = 0
+FILTER_SUB = 1
+FILTER_UP = 2
+FILTER_AVERAGE = 3
+FILTER_PAETH = 4
+
+
+# --- Helpers ---
+
+
+def read_chunks(data) -> List[Tuple[bytes, bytes]]:
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+    chunks = []
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        (length,) = struct.unpack(">I", data[offset : offset + 4])
+        chunk_type = data[offset + 4 : offset + 8]
+        chunks.append((chunk_type, data[offset + 8 : offset + 8 + length]))
+        offset += 12 + length
+        if chunk_type == b"IEND":
+            break
+    return chunks
+
+
+def write_chunks(chunks):
+    parts = [PNG_SIGNATURE]
+    for chunk_type, body in chunks:
+        crc = zlib.crc32(chunk_type + body) & 0xFFFFFFFF
+        parts.append(struct.pack(">I", len(body)) + chunk_type + body)
+        parts.append(struct.pack(">I", crc))
+    return b"".join(parts)
+
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def unfilter_rows(filtered, row_bytes, height, bpp) -> List[bytearray]:
+    rows = []
+    previous = bytearray(row_bytes)
+    stride = row_bytes + 1
+    for y in range(height):
+        filter_type = filtered[y * stride]
+        row = bytearray(filtered[y * stride + 1 : (y + 1) * stride])
+        if filter_type == FILTER_SUB:
+            for i in range(bpp, row_bytes):
+                row[i] = (row[i] + row[i - bpp]) & 0xFF
+        elif filter_type == FILTER_UP:
+            for i in range(row_bytes):
+                row[i] = (row[i] + previous[i]) & 0xFF
+        elif filter_type == FILTER_AVERAGE:
+            for i in range(row_bytes):
+                left = row[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif filter_type == FILTER_PAETH:
+            for i in range(row_bytes):
+                left = row[i - bpp] if i >= bpp else 0
+                upper_left = previous[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + _paeth(left, previous[i], upper_left)) & 0xFF
+        elif filter_type != FILTER_NONE:
+            raise ValueError(f"Invalid PNG filter type {filter_type}")
+        rows.append(row)
+        previous = row
+    return rows
+
+
+def filter_row(filter_type, row, previous, bpp):
+    if filter_type == FILTER_NONE:
+        return bytes(row)
+    out = bytearray(len(row))
+    for i in range(len(row)):
+        left = row[i - bpp] if i >= bpp else 0
+        if filter_type == FILTER_SUB:
+            predictor = left
+        elif filter_type == FILTER_UP:
+            predictor = previous[i]
+        elif filter_type == FILTER_AVERAGE:
+            predictor = (left + previous[i]) >> 1
+        else:
+            upper_left = previous[i - bpp] if i >= bpp else 0
+            predictor = _paeth(left, previous[i], upper_left)
+        out[i] = (row[i] - predictor) & 0xFF
+    return bytes(out)
+
+
+def refilter_rows(rows, bpp, adaptive):
+    """
+    Filter scanlines either with no filter at all or, when adaptive, with the
+    filter minimising the sum of absolute signed residuals of each row.
+    """
+    previous = bytearray(len(rows[0]) if rows else 0)
+    parts = []
+    for row in rows:
+        if adaptive:
+            candidates = [
+                (filter_type, filter_row(filter_type, row, previous, bpp))
+                for filter_type in range(FILTER_PAETH + 1)
+            ]
+            filter_type, filtered = min(
+                candidates,
+                key=lambda c: sum(b if b < 128 else 256 - b for b in c[1]),
+            )
+        else:
+            filter_type, filtered = FILTER_NONE, bytes(row)
+        parts.append(bytes([filter_type]) + filtered)
+        previous = row
+    return b"".join(parts)
+
+
+def optimize_png(data):
+    """
+    Losslessly recompress a PNG: decoded pixels stay byte-identical, only the
+    scanline filters, the deflate stream and textual metadata change.
+    Returns the original bytes when no smaller encoding is found.
+    """
+    try:
+        chunks = read_chunks(data)
+        header = dict(chunks).get(b"IHDR")
+        width, height, bit_depth, color_type, _, _, interlace = struct.unpack(
+            ">IIBBBBB", header
+        )
+        filtered = zlib.decompress(
+            b"".join(body for chunk_type, body in chunks if chunk_type == b"IDAT")
+        )
+    except (ValueError, TypeError, struct.error, zlib.error):
+        return data
+
+    candidates = [filtered]
+    if interlace == 0 and color_type in CHANNELS_BY_COLOR_TYPE:
+        bits_per_pixel = CHANNELS_BY_COLOR_TYPE[color_type] * bit_depth
+        row_bytes = (width * bits_per_pixel + 7) // 8
+        bpp = max(1, bits_per_pixel // 8)
+        try:
+            rows = unfilter_rows(filtered, row_bytes, height, bpp)
+        except (ValueError, IndexError):
+            return data
+        candidates.append(refilter_rows(rows, bpp, adaptive=False))
+        candidates.append(refilter_rows(rows, bpp, adaptive=True))
+
+    compressed = min((zlib.compress(candidate, 9) for candidate in candidates), key=len)
+    optimized_chunks = []
+    for chunk_type, body in chunks:
+        if chunk_type == b"IDAT":
+            # All IDAT chunks are consecutive; replace them with a single one.
+            if optimized_chunks[-1][0] != b"IDAT":
+                optimized_chunks.append((b"IDAT", compressed))
+        elif chunk_type not in DROPPABLE_CHUNKS:
+            optimized_chunks.append((chunk_type, body))
+    optimized = write_chunks(optimized_chunks)
+    return optimized if len(optimized) < len(data) else data
+
+
+def decode_rgba(data) -> Tuple[int, int, List[bytearray]]:
+    """
+    Decode an 8-bit, non-interlaced PNG into RGBA rows.
+    Raises ValueError for PNG variants this decoder does not handle.
+    """
+    chunks = read_chunks(data)
+    chunk_map = dict(chunks)
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(
+        ">IIBBBBB", chunk_map[b"IHDR"]
+    )
+    if bit_depth != 8 or interlace != 0 or color_type not in CHANNELS_BY_COLOR_TYPE:
+        raise ValueError("Unsupported PNG format")
+
+    channels = CHANNELS_BY_COLOR_TYPE[color_type]
+    try:
+        filtered = zlib.decompress(b"".join(b for t, b in chunks if t == b"IDAT"))
+        rows = unfilter_rows(filtered, width * channels, height, channels)
+    except (zlib.error, IndexError) as e:
+        raise ValueError(f"Corrupt PNG data: {e}")
+
+    if color_type == 6:
+        return width, height, rows
+
+    palette = chunk_map.get(b"PLTE", b"")
+    transparency = chunk_map.get(b"tRNS", b"")
+    rgba_rows = []
+    for row in rows:
+        rgba = bytearray(width * 4)
+        for x in range(width):
+            pixel = row[x * channels : (x + 1) * channels]
+            if color_type == 0:
+                r = g = b = pixel[0]
+                a = 255
+            elif color_type == 4:
+                r = g = b = pixel[0]
+                a = pixel[1]
+            elif color_type == 2:
+                r, g, b = pixel
+                a = 255
+            else:
+                index = pixel[0]
+                r, g, b = palette[index * 3 : index * 3 + 3]
+                a = transparency[index] if index < len(transparency) else 255
+            rgba[x * 4 : x * 4 + 4] = bytes((r, g, b, a))
+        rgba_rows.append(rgba)
+    return width, height, rgba_rows
+
+
+def encode_rgba(width, height, rows):
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    raw = b"".join(b"\x00" + bytes(row) for row in rows)
+    return write_chunks(
+        [(b"IHDR", header), (b"IDAT", zlib.compress(raw, 9)), (b"IEND", b"")]
+    )
+
+
+# --- Core Logic ---
+
+
+class PngOptimizer:
+    """
+    Optimises PNG pages in a process pool. Results are cached on disk by a
+    digest of the input, so unchanged pages are never recompressed.
+    """
+
+    def __init__(self, cache_dir, max_workers=None):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+
+    def optimize_files(self, paths) -> Dict[str, Tuple[int, int]]:
+        """
+        Optimise the given PNG files in place.
+        Returns the original and optimised size of each file.
+        """
+        originals = {}
+        for path in paths:
+            with open(path, "rb") as f:
+                originals[path] = f.read()
+
+        results = {}
+        misses = []
+        for path, data in originals.items():
+            cached = self._cache_get(self._cache_key(data))
+            if cached is not None:
+                results[path] = cached
+            else:
+                misses.append(path)
+
+        if misses:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                optimized = executor.map(
+                    optimize_png, [originals[path] for path in misses]
+                )
+                for path, data in zip(misses, optimized):
+                    self._cache_put(self._cache_key(originals[path]), data)
+                    results[path] = data
+
+        sizes = {}
+        for path, data in results.items():
+            if data != originals[path]:
+                with open(path, "wb") as f:
+                    f.write(data)
+            sizes[path] = (len(originals[path]), len(data))
+        return sizes
+
+    def _cache_key(self, data):
+        return hash_values(PNG_OPTIMIZER_VERSION, hash_bytes(data))
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key + PNG_EXTENSION)
+
+    def _cache_get(self, key):
+        try:
+            with open(self._cache_path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _cache_put(self, key, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{self._cache_path(key)}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, self._cache_path(key))
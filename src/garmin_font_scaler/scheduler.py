@@ -0,0 +1,240 @@
+import dataclasses
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+# --- Configuration Constants ---
+
+DEFAULT_HISTORY_FILENAME = ".font-scaler-history.json"
+HISTORY_VERSION = 1
+
+# Weight of the newest measurement in the moving average of wall times
+WALL_TIME_SMOOTHING = 0.5
+
+JSON_VERSION_KEY = "version"
+JSON_JOBS_KEY = "jobs"
+JSON_WALL_TIME_KEY = "wallTime"
+JSON_PEAK_RSS_KEY = "peakRss"
+JSON_COST_KEY = "cost"
+JSON_RUNS_KEY = "runs"
+
+
+# --- Data Structures ---
+
+
+@dataclasses.dataclass
+class ToolJob:
+    key: str
+    command: List[str]
+    cost: int
+    ttf_filename: str
+    output_dir: str = ""
+    source_ttf_path: str = ""
+    charset: str = ""
+    sizes: List[int] = dataclasses.field(default_factory=list)
+    cache_key: Optional[str] = None
+
+
+@dataclasses.dataclass
+class ToolRun:
+    wall_time: float
+    peak_rss: Optional[int]  # KiB, None where the platform cannot measure it
+
+
+# --- Helpers ---
+
+
+def job_key(ttf_filename, charset, sizes):
+    """History key of a tool invocation: TTF, charset length and sizes."""
+    return f"{ttf_filename}|{len(charset)}|{','.join(map(str, sizes))}"
+
+
+def estimate_render_cost(charset, sizes):
+    # Rendering cost grows with the number of glyphs and their pixel area,
+    # so estimate it as charset length times the sum of squared sizes,
+    # plus one unit of process start-up per tool invocation.
+    return 1 + len(charset) * sum(size * size for size in sizes)
+
+
+def run_tool(command, env=None) -> ToolRun:
+    """
+    Run a font tool command to completion, measuring its wall time and,
+    where the platform supports it, the peak resident set size of the child.
+    Raises CalledProcessError on a non-zero exit status.
+    """
+    start_time = time.perf_counter()
+    process = subprocess.Popen(
+        command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env
+    )
+    peak_rss = None
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(process.pid, 0)
+        if os.WIFSIGNALED(status):
+            process.returncode = -os.WTERMSIG(status)
+        else:
+            process.returncode = os.WEXITSTATUS(status)
+        # ru_maxrss is reported in bytes on macOS and in KiB elsewhere
+        peak_rss = usage.ru_maxrss
+        if sys.platform == "darwin":
+            peak_rss //= 1024
+    else:
+        process.wait()
+    wall_time = time.perf_counter() - start_time
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    return ToolRun(wall_time=wall_time, peak_rss=peak_rss)
+
+
+# --- Core Logic ---
+
+
+class JobHistory:
+    """
+    Measured wall time and peak memory of past tool invocations, persisted
+    across runs as JSON. Unseen jobs are estimated from the observed time and
+    memory per unit of render cost.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.jobs: Dict[str, dict] = {}
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return self
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (IOError, json.JSONDecodeError):
+            # A corrupt history only costs scheduling quality; start afresh.
+            return self
+        if data.get(JSON_VERSION_KEY) == HISTORY_VERSION:
+            self.jobs = data.get(JSON_JOBS_KEY, {})
+        return self
+
+    def save(self):
+        if not self.path:
+            return self
+        data = {JSON_VERSION_KEY: HISTORY_VERSION, JSON_JOBS_KEY: self.jobs}
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+        return self
+
+    def record(self, job: ToolJob, tool_run: ToolRun):
+        entry = self.jobs.get(job.key)
+        if entry is None:
+            entry = {JSON_WALL_TIME_KEY: tool_run.wall_time, JSON_RUNS_KEY: 0}
+            self.jobs[job.key] = entry
+        entry[JSON_WALL_TIME_KEY] = (
+            WALL_TIME_SMOOTHING * tool_run.wall_time
+            + (1 - WALL_TIME_SMOOTHING) * entry[JSON_WALL_TIME_KEY]
+        )
+        if tool_run.peak_rss is not None:
+            # Keep the worst observed peak: admission must stay conservative.
+            entry[JSON_PEAK_RSS_KEY] = max(
+                tool_run.peak_rss, entry.get(JSON_PEAK_RSS_KEY, 0)
+            )
+        entry[JSON_COST_KEY] = job.cost
+        entry[JSON_RUNS_KEY] += 1
+
+    def estimate_wall_time(self, job: ToolJob):
+        entry = self.jobs.get(job.key)
+        if entry is not None:
+            return entry[JSON_WALL_TIME_KEY]
+        return self._extrapolate(JSON_WALL_TIME_KEY, job.cost, default_rate=1.0)
+
+    def estimate_peak_rss(self, job: ToolJob):
+        entry = self.jobs.get(job.key)
+        if entry is not None and JSON_PEAK_RSS_KEY in entry:
+            return entry[JSON_PEAK_RSS_KEY]
+        return self._extrapolate(JSON_PEAK_RSS_KEY, job.cost, default_rate=0.0)
+
+    def _extrapolate(self, field, cost, default_rate):
+        """
+        Estimate a metric of an unseen job as a fixed overhead plus a rate per
+        unit of cost. The overhead is taken from the job with the smallest
+        observed value (process start-up, interpreter memory), and the rate is
+        the median marginal rate of the other jobs relative to it.
+        """
+        samples = [
+            (entry[JSON_COST_KEY], entry[field])
+            for entry in self.jobs.values()
+            if field in entry and entry.get(JSON_COST_KEY)
+        ]
+        if not samples:
+            return cost * default_rate
+        if len(samples) == 1:
+            sample_cost, value = samples[0]
+            return cost * value / sample_cost
+
+        base_cost, overhead = min(samples, key=lambda sample: (sample[1], sample[0]))
+        rates = sorted(
+            max(0.0, (value - overhead) / (sample_cost - base_cost))
+            for sample_cost, value in samples
+            if sample_cost > base_cost
+        )
+        rate = statistics.median(rates) if rates else 0.0
+        return overhead + max(0, cost - base_cost) * rate
+
+
+class ConcurrencyGovernor:
+    """
+    Runs tool jobs in parallel, longest first, admitting a job only while the
+    estimated peak memory of all running jobs stays under the memory limit.
+    """
+
+    def __init__(self, history: JobHistory, max_workers=None, memory_limit=None):
+        self.history = history
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.memory_limit = memory_limit  # KiB, None for no limit
+
+    def run(self, jobs: List[ToolJob], execute: Callable[[ToolJob], Optional[ToolRun]]):
+        """
+        Run all jobs through execute. Jobs for which execute returns None
+        (for example, served from a cache) are not recorded in the history.
+        """
+        pending = sorted(
+            jobs, key=lambda job: (-self.history.estimate_wall_time(job), job.key)
+        )
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for job in self._admit(pending, running.values()):
+                    pending.remove(job)
+                    running[executor.submit(execute, job)] = job
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    tool_run = future.result()
+                    if tool_run is not None:
+                        self.history.record(job, tool_run)
+
+    def _admit(self, pending, running):
+        running = list(running)
+        reserved = sum(self.history.estimate_peak_rss(job) for job in running)
+        slots = self.max_workers - len(running)
+        admitted = []
+        for job in pending:
+            if len(admitted) >= slots:
+                break
+            peak_rss = self.history.estimate_peak_rss(job)
+            fits = (
+                self.memory_limit is None
+                or reserved + peak_rss <= self.memory_limit
+                # Never stall: an oversized job runs alone.
+                or not (running or admitted)
+            )
+            if fits:
+                admitted.append(job)
+                reserved += peak_rss
+        return admitted
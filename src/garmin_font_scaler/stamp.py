@@ -0,0 +1,97 @@
+import json
+import os
+
+# Kept free of heavy imports: the CLI checks the stamp before loading the
+# rest of the pipeline.
+
+# --- Configuration Constants ---
+
+DEFAULT_STAMP_FILENAME = ".font-scaler-stamp.json"
+STAMP_VERSION = 1
+
+JSON_VERSION_KEY = "version"
+JSON_OPTIONS_KEY = "options"
+JSON_FILES_KEY = "files"
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# --- Helpers ---
+
+
+def snapshot(paths):
+    """Stat markers (mtime in ns, size) of files, None for missing files."""
+    markers = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            markers[path] = None
+        else:
+            markers[path] = [stat.st_mtime_ns, stat.st_size]
+    return markers
+
+
+def find_executable(tool_path):
+    """Resolve a tool path like the shell would, without importing shutil."""
+    if os.path.dirname(tool_path):
+        return tool_path
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        candidate = os.path.join(directory, tool_path)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def package_paths():
+    """Source files of this package, so that upgrades invalidate the stamp."""
+    return [
+        os.path.join(PACKAGE_DIR, filename)
+        for filename in sorted(os.listdir(PACKAGE_DIR))
+        if filename.endswith(".py")
+    ]
+
+
+# --- Core Logic ---
+
+
+class BuildStamp:
+    """
+    Stat-only snapshot of every input and output of the last successful
+    build, with the options it ran with. While nothing in the snapshot has
+    changed, another build with the same options would be a no-op.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def is_current(self, options):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get(JSON_VERSION_KEY) != STAMP_VERSION:
+            return False
+        if data.get(JSON_OPTIONS_KEY) != options:
+            return False
+        files = data.get(JSON_FILES_KEY, {})
+        return bool(files) and snapshot(files) == files
+
+    def save(self, options, inputs, outputs):
+        """Record a build; inputs are snapshotted as of its start."""
+        files = dict(inputs)
+        files.update(snapshot(outputs))
+        data = {
+            JSON_VERSION_KEY: STAMP_VERSION,
+            JSON_OPTIONS_KEY: options,
+            JSON_FILES_KEY: files,
+        }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
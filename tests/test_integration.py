@@ -1,6 +1,18 @@
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import xml.etree.ElementTree as ET
 import pytest
 from unittest.mock import patch
+from garmin_font_scaler.benchmark import BenchmarkHistory, run_benchmark
+from garmin_font_scaler.bmfont import Glyph, assemble_font, parse_fnt
+from garmin_font_scaler.cli import main
 from garmin_font_scaler.core import FontProcessor
+from garmin_font_scaler.daemon import FontScalerDaemon, send_request
+from garmin_font_scaler.scheduler import ToolRun
 
 # Updated Sample XML with new JSON format
 SAMPLE_XML = """
@@ -20,6 +32,13 @@ SAMPLE_XML = """
 """
 
 
+def patch_font_tool():
+    return patch(
+        "garmin_font_scaler.core.run_tool",
+        return_value=ToolRun(wall_time=0.0, peak_rss=None),
+    )
+
+
 @pytest.fixture
 def workspace(tmp_path):
     project_dir = tmp_path / "my_project"
@@ -43,7 +62,7 @@ def test_pipeline_execution(workspace):
         FontProcessor().with_project_dir(str(project_dir)).with_font_tool_path("echo")
     )
 
-    with patch("subprocess.run") as mock_run:
+    with patch_font_tool() as mock_run:
         processor.parse_source_xml().execute()
 
         assert mock_run.called
@@ -62,3 +81,345 @@ def test_pipeline_execution(workspace):
     output_xml = output_dir_rect / "fonts.xml"
     content = output_xml.read_text()
     assert "jsonData" not in content
+
+
+def test_sharded_reports_merge_into_full_report(workspace):
+    project_dir = workspace
+
+    with patch_font_tool():
+        (
+            FontProcessor()
+            .with_project_dir(str(project_dir))
+            .with_table_filename("full.md")
+            .parse_source_xml()
+            .execute()
+        )
+        for index in (1, 2):
+            (
+                FontProcessor()
+                .with_project_dir(str(project_dir))
+                .with_shard(f"{index}/2")
+                .parse_source_xml()
+                .execute()
+            )
+
+    partials = [str(project_dir / f"fonts-shard-{i}-of-2.json") for i in (2, 1)]
+    (
+        FontProcessor()
+        .with_project_dir(str(project_dir))
+        .with_table_filename("merged.md")
+        .load_partial_reports(partials)
+        .write_report()
+    )
+
+    full = (project_dir / "full.md").read_text()
+    assert (project_dir / "merged.md").read_text() == full
+
+
+def test_unchanged_outputs_are_not_rewritten(workspace):
+    project_dir = workspace
+    output_xml = project_dir / "resources-round-454x454" / "fonts" / "fonts.xml"
+
+    with patch_font_tool():
+        processor = FontProcessor().with_project_dir(str(project_dir))
+        processor.parse_source_xml().execute()
+        assert processor.files_changed == processor.files_staged == 2
+
+        os.utime(output_xml, (0, 0))
+        processor.parse_source_xml().execute()
+        assert processor.files_changed == 0
+
+    assert output_xml.stat().st_mtime == 0
+    assert not list(project_dir.glob(".font-scaler-staging-*"))
+
+
+def test_daemon_reuses_renders_until_sources_change(workspace):
+    daemon = FontScalerDaemon(socket_path=None)
+    options = {"project_dir": str(workspace)}
+
+    with patch_font_tool() as mock_run:
+        assert daemon.handle_request({"command": "build", "options": options})["ok"]
+        assert mock_run.call_count == 2
+
+        assert daemon.handle_request({"command": "build", "options": options})["ok"]
+        assert mock_run.call_count == 2
+
+        (workspace / "resources" / "fonts" / "Ubuntu-Bold.ttf").write_text("changed")
+        assert daemon.handle_request({"command": "build", "options": options})["ok"]
+        assert mock_run.call_count == 4
+
+    response = daemon.handle_request({"command": "report", "options": options})
+    assert "| Ubuntu bold |" in response["output"]
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="requires Unix sockets")
+def test_daemon_serves_requests_over_socket(workspace):
+    socket_path = str(workspace / "daemon.sock")
+    daemon = FontScalerDaemon(socket_path)
+    server_thread = threading.Thread(target=daemon.serve_forever)
+    server_thread.start()
+    try:
+        for _ in range(100):
+            if os.path.exists(socket_path):
+                break
+            time.sleep(0.01)
+        response = send_request(socket_path, "plan", {"project_dir": str(workspace)})
+        assert response["ok"]
+        assert "round-454x454" in response["output"]
+    finally:
+        send_request(socket_path, "shutdown")
+        server_thread.join(timeout=5)
+    assert not os.path.exists(socket_path)
+
+
+def test_selective_build_leaves_other_targets_untouched(workspace):
+    project_dir = workspace
+
+    with patch_font_tool() as mock_run:
+        (
+            FontProcessor()
+            .with_project_dir(str(project_dir))
+            .with_target_filter("round-454x454")
+            .parse_source_xml()
+            .execute()
+        )
+        assert mock_run.call_count == 1
+
+    assert (project_dir / "resources-round-454x454" / "fonts" / "fonts.xml").exists()
+    assert not (project_dir / "resources-rectangle-148x205").exists()
+
+
+def test_daemon_does_not_share_renders_between_identical_ttfs(workspace):
+    fonts_dir = workspace / "resources" / "fonts"
+    xml = (fonts_dir / "fonts.xml").read_text()
+    xml = xml.replace(
+        "</fonts>", '    <font id="DataFont" filename="Ubuntu-Copy-60.fnt" />\n</fonts>'
+    )
+    (fonts_dir / "fonts.xml").write_text(xml)
+    (fonts_dir / "Ubuntu-Copy.ttf").write_text("dummy binary content")
+
+    daemon = FontScalerDaemon(socket_path=None)
+    options = {"project_dir": str(workspace), "jobs": 1}
+    with patch_font_tool() as mock_run:
+        assert daemon.handle_request({"command": "build", "options": options})["ok"]
+        assert mock_run.call_count == 4
+
+
+def fake_font_tool(command):
+    """Render each requested character as a solid block, like ttf2bmp would."""
+    options = dict(zip(command[1::2], command[2::2]))
+    for size in options["-s"].split(","):
+        stem = "{}-{}".format(os.path.basename(options["-f"])[: -len(".ttf")], size)
+        template = parse_fnt(
+            f"info face=Fake size={size}\n"
+            "common lineHeight=8 base=6 scaleW=32 scaleH=32 pages=1\n"
+            f'page id=0 file="{stem}_0.png"\n'
+        )
+        glyphs = {
+            ord(char): Glyph(4, 6, 0, 1, 5, 15, bytes([ord(char), 0, 0, 255]) * 24)
+            for char in options["-c"]
+        }
+        fnt_text, pages = assemble_font(template, glyphs, stem)
+        with open(os.path.join(options["-o"], f"{stem}.fnt"), "w") as f:
+            f.write(fnt_text)
+        for filename, content in pages.items():
+            with open(os.path.join(options["-o"], filename), "wb") as f:
+                f.write(content)
+    return ToolRun(wall_time=0.0, peak_rss=None)
+
+
+def make_ttf(*tags):
+    """An sfnt table directory listing the given tables, without their data."""
+    records = b"".join(struct.pack(">4sIII", tag, 0, 0, 0) for tag in tags)
+    return b"\x00\x01\x00\x00" + struct.pack(">HHHH", len(tags), 0, 0, 0) + records
+
+
+def kerning_font_tool(command):
+    """Like fake_font_tool, kerning the pair 'AV' when both are rendered."""
+    tool_run = fake_font_tool(command)
+    options = dict(zip(command[1::2], command[2::2]))
+    if "A" in options["-c"] and "V" in options["-c"]:
+        for filename in os.listdir(options["-o"]):
+            if filename.endswith(".fnt"):
+                with open(os.path.join(options["-o"], filename), "a") as f:
+                    f.write("kernings count=1\nkerning first=65 second=86 amount=-2\n")
+    return tool_run
+
+
+def test_glyph_cache_keeps_kerning_between_new_and_cached_glyphs(workspace):
+    fonts_dir = workspace / "resources" / "fonts"
+    (fonts_dir / "Ubuntu-Bold.ttf").write_bytes(make_ttf(b"cmap", b"kern"))
+    xml_file = fonts_dir / "fonts.xml"
+    source_xml = xml_file.read_text()
+    output_fnt = workspace / "resources-round-454x454" / "fonts" / "Ubuntu-Bold-97.fnt"
+
+    for charset in ("A", "AV"):
+        xml_file.write_text(source_xml.replace('"0-9"', f'"{charset}"'))
+        with patch("garmin_font_scaler.core.run_tool", side_effect=kerning_font_tool):
+            FontProcessor().with_project_dir(str(workspace)).with_glyph_cache(
+                True
+            ).parse_source_xml().execute()
+
+    assert parse_fnt(output_fnt.read_text()).kernings == [
+        {"first": "65", "second": "86", "amount": "-2"}
+    ]
+    assert not (workspace / ".font-scaler-cache" / "glyphs").exists()
+
+
+def test_glyph_cache_renders_only_new_characters(workspace):
+    output_fnt = workspace / "resources-round-454x454" / "fonts" / "Ubuntu-Bold-97.fnt"
+
+    def build():
+        with patch(
+            "garmin_font_scaler.core.run_tool", side_effect=fake_font_tool
+        ) as mock_run:
+            FontProcessor().with_project_dir(str(workspace)).with_glyph_cache(
+                True
+            ).parse_source_xml().execute()
+        return [
+            call[0][0][call[0][0].index("-c") + 1] for call in mock_run.call_args_list
+        ]
+
+    assert sorted(build()) == ["0-9", "0-9"]
+    assert len(parse_fnt(output_fnt.read_text()).chars) == 3
+
+    xml_file = workspace / "resources" / "fonts" / "fonts.xml"
+    xml_file.write_text(xml_file.read_text().replace('"0-9"', '"0-9:"'))
+    assert build() == [":", ":"]
+    assert sorted(parse_fnt(output_fnt.read_text()).chars) == [45, 48, 57, 58]
+
+    assert build() == []
+
+
+def test_chunked_render_merges_into_one_font(workspace):
+    xml_file = workspace / "resources" / "fonts" / "fonts.xml"
+    xml_file.write_text(xml_file.read_text().replace('"0-9"', '"0123456789"'))
+
+    with patch(
+        "garmin_font_scaler.core.run_tool", side_effect=fake_font_tool
+    ) as mock_run:
+        FontProcessor().with_project_dir(str(workspace)).with_chunk_size(
+            4
+        ).parse_source_xml().execute()
+    charsets = [
+        call[0][0][call[0][0].index("-c") + 1] for call in mock_run.call_args_list
+    ]
+    assert sorted(charsets) == sorted(["0123", "4567", "89"] * 2)
+
+    fonts_dir = workspace / "resources-round-454x454" / "fonts"
+    font = parse_fnt((fonts_dir / "Ubuntu-Bold-97.fnt").read_text())
+    assert sorted(font.chars) == [ord(char) for char in "0123456789"]
+    assert font.common["pages"] == "3"
+    assert sorted(font.pages.values()) == [
+        f"Ubuntu-Bold-97_{page}.png" for page in range(3)
+    ]
+    assert all((fonts_dir / filename).exists() for filename in font.pages.values())
+    assert not [
+        name
+        for name in os.listdir(workspace)
+        if name.startswith(".font-scaler-staging")
+    ]
+
+
+def test_fonts_that_can_kern_are_not_chunked(workspace):
+    fonts_dir = workspace / "resources" / "fonts"
+    (fonts_dir / "Ubuntu-Bold.ttf").write_bytes(make_ttf(b"cmap", b"GPOS"))
+    xml_file = fonts_dir / "fonts.xml"
+    xml_file.write_text(xml_file.read_text().replace('"0-9"', '"AV0123456789"'))
+
+    with patch(
+        "garmin_font_scaler.core.run_tool", side_effect=kerning_font_tool
+    ) as mock_run:
+        FontProcessor().with_project_dir(str(workspace)).with_chunk_size(
+            4
+        ).parse_source_xml().execute()
+    charsets = [
+        call[0][0][call[0][0].index("-c") + 1] for call in mock_run.call_args_list
+    ]
+    assert charsets == ["AV0123456789"] * 2
+
+    font = parse_fnt(
+        (
+            workspace / "resources-round-454x454" / "fonts" / "Ubuntu-Bold-97.fnt"
+        ).read_text()
+    )
+    assert len(font.chars) == 12
+    assert len(font.kernings) == 1
+
+
+def test_glyph_cache_with_chunked_renders(workspace):
+    xml_file = workspace / "resources" / "fonts" / "fonts.xml"
+    xml_file.write_text(xml_file.read_text().replace('"0-9"', '"0123456789"'))
+
+    def build():
+        with patch(
+            "garmin_font_scaler.core.run_tool", side_effect=fake_font_tool
+        ) as mock_run:
+            FontProcessor().with_project_dir(str(workspace)).with_chunk_size(
+                4
+            ).with_glyph_cache(True).parse_source_xml().execute()
+        return mock_run.call_count
+
+    assert build() == 6
+    assert build() == 0
+    font = parse_fnt(
+        (
+            workspace / "resources-round-454x454" / "fonts" / "Ubuntu-Bold-97.fnt"
+        ).read_text()
+    )
+    assert sorted(font.chars) == [ord(char) for char in "0123456789"]
+
+
+def test_vector_font_targets_skip_bitmap_rendering(workspace):
+    xml_file = workspace / "resources" / "fonts" / "fonts.xml"
+    xml_file.write_text(
+        xml_file.read_text().replace(
+            '"shape": "rectangle" }', '"shape": "rectangle", "vectorFonts": true }'
+        )
+    )
+
+    with patch_font_tool() as mock_run:
+        FontProcessor().with_project_dir(str(workspace)).parse_source_xml().execute()
+        assert mock_run.call_count == 1
+        args = mock_run.call_args[0][0]
+        assert args[args.index("-s") + 1] == "97"
+
+    target_xml = workspace / "resources-rectangle-148x205" / "fonts" / "fonts.xml"
+    root = ET.parse(str(target_xml)).getroot()
+    assert root.findall(".//font") == []
+    mapping = json.loads(root.find(".//jsonData[@id='VectorFonts']").text)
+    assert mapping == {"TimeFont": {"face": "Ubuntu-Bold", "size": 32}}
+
+
+@pytest.mark.skipif(not hasattr(os, "wait4"), reason="requires wait4")
+def test_benchmark_records_cold_and_noop_builds(tmp_path):
+    results = str(tmp_path / "benchmarks.jsonl")
+    run_benchmark(results, font_count=2, target_count=2, repeat=1)
+
+    records = BenchmarkHistory(results).load()
+    assert [r["scenario"] for r in records] == ["cold", "noop"]
+    cold, noop = records
+    assert cold["subprocesses"] == 4
+    assert cold["filesWritten"] == 2 * (2 * 2 + 1)
+    assert noop["filesWritten"] == 0
+    assert cold["wallTime"] > 0
+
+
+def test_cli_skips_builds_when_nothing_changed(workspace, capsys):
+    argv = ["garmin-font-scaler", "--project-dir", str(workspace)]
+    with patch("sys.argv", argv), patch_font_tool() as mock_run:
+        main()
+        assert mock_run.call_count == 2
+
+        main()
+        assert mock_run.call_count == 2
+        assert "Up to date" in capsys.readouterr().err
+
+        ttf_file = workspace / "resources" / "fonts" / "Ubuntu-Bold.ttf"
+        ttf_file.write_text("changed binary content")
+        main()
+        assert mock_run.call_count == 4
+
+    with patch("sys.argv", argv + ["--force"]), patch_font_tool() as mock_run:
+        main()
+        assert mock_run.call_count == 2
@@ -1,6 +1,7 @@
 import time
 from unittest.mock import patch
 from garmin_font_scaler.core import FontProcessor, FontTask, ScreenConfig
+from garmin_font_scaler.scheduler import ToolRun
 
 
 def create_dummy_task(font_name, size):
@@ -46,9 +47,12 @@ def test_batch_processing_benchmark(tmp_path):
 
     start_time = time.perf_counter()
 
-    with patch("subprocess.run") as mock_run, patch(
-        "xml.etree.ElementTree.parse"
-    ), patch("xml.etree.ElementTree.ElementTree.write"):
+    tool_run = ToolRun(wall_time=0.0, peak_rss=None)
+    with patch(
+        "garmin_font_scaler.core.run_tool", return_value=tool_run
+    ) as mock_run, patch("xml.etree.ElementTree.parse"), patch(
+        "xml.etree.ElementTree.ElementTree.write"
+    ):
         processor.execute()
 
         # Verify optimization: 2 targets, 1 font source -> 2 calls (1 per target resolution)
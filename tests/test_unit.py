@@ -1,5 +1,50 @@
+import io
 import os
-from garmin_font_scaler.core import FontProcessor, FontTask, ScreenConfig
+import struct
+import subprocess
+import sys
+import threading
+import zlib
+
+import pytest
+
+from garmin_font_scaler.benchmark import (
+    BenchmarkHistory,
+    compare_benchmarks,
+    current_commit,
+)
+from garmin_font_scaler.bmfont import (
+    Glyph,
+    assemble_font,
+    merge_fonts,
+    parse_fnt,
+    read_font,
+)
+from garmin_font_scaler.cache import FileFingerprints, RenderCache
+from garmin_font_scaler.core import (
+    FontProcessor,
+    FontScalerError,
+    FontTask,
+    ScreenConfig,
+    parse_shard_spec,
+    ttf_has_kerning,
+)
+from garmin_font_scaler.glyphs import GlyphCache, GlyphSet
+from garmin_font_scaler.pngopt import (
+    PngOptimizer,
+    decode_rgba,
+    optimize_png,
+    read_chunks,
+    unfilter_rows,
+    write_chunks,
+)
+from garmin_font_scaler.scheduler import (
+    ConcurrencyGovernor,
+    JobHistory,
+    ToolJob,
+    ToolRun,
+    run_tool,
+)
 
 
 def test_calculate_size():
@@ -50,3 +95,422 @@ def test_humanize_names():
     el, font = fp._humanize_names(task)
     assert el == "Single line hour"
     assert font == "SUSEMono bold"
+
+
+def test_merge_rejects_files_that_are_not_partial_reports(tmp_path):
+    for content in ["{}", "[]", '{"shard": {"index": 1, "count": 1}}']:
+        path = tmp_path / "partial.json"
+        path.write_text(content)
+        with pytest.raises(FontScalerError, match="is not a partial report"):
+            FontProcessor().load_partial_reports([str(path)])
+
+
+def test_chunk_size_must_be_positive():
+    for chunk_size in [0, -1]:
+        with pytest.raises(FontScalerError):
+            FontProcessor().with_chunk_size(chunk_size)
+    assert FontProcessor().with_chunk_size(1).chunk_size == 1
+
+
+def test_parse_shard_spec():
+    assert parse_shard_spec("2/4") == (2, 4)
+    for spec in ["0/4", "5/4", "1", "a/b"]:
+        with pytest.raises(FontScalerError):
+            parse_shard_spec(spec)
+
+
+def test_shard_partition_is_complete_and_disjoint():
+    fp = FontProcessor()
+    fp.reference_config = ScreenConfig(width=280, height=280, shape="round")
+    fp.target_configs = [
+        ScreenConfig(width=size, height=size, shape="round")
+        for size in range(200, 460, 20)
+    ]
+    fp.font_tasks = [
+        FontTask(None, "TimeFont", "Ubuntu", "", "Ubuntu.ttf", 40, 0, "0-9")
+    ]
+
+    assigned = []
+    for index in range(1, 4):
+        assigned.extend(fp.with_shard((index, 3))._selected_target_indices())
+
+    assert sorted(assigned) == list(range(len(fp.target_configs)))
+
+
+def make_job(key, cost):
+    return ToolJob(key=key, command=[], cost=cost, ttf_filename=f"{key}.ttf")
+
+
+def test_governor_runs_longest_first():
+    history = JobHistory()
+    jobs = [make_job("small", 10), make_job("large", 1000), make_job("medium", 100)]
+    for job in jobs:
+        history.record(job, ToolRun(wall_time=job.cost / 100, peak_rss=job.cost))
+
+    started = []
+
+    def execute(job):
+        started.append(job.key)
+        return ToolRun(wall_time=0.0, peak_rss=None)
+
+    ConcurrencyGovernor(history, max_workers=1).run(jobs, execute)
+    assert started == ["large", "medium", "small"]
+
+
+def test_governor_admits_jobs_under_memory_limit():
+    history = JobHistory()
+    jobs = [make_job("large", 1000), make_job("medium", 600), make_job("small", 300)]
+    for job in jobs:
+        history.record(job, ToolRun(wall_time=1.0, peak_rss=job.cost))
+
+    governor = ConcurrencyGovernor(history, max_workers=4, memory_limit=1400)
+    admitted = governor._admit(jobs, [])
+    assert [job.key for job in admitted] == ["large", "small"]
+
+    # An oversized job is still admitted when nothing else is running
+    governor.memory_limit = 100
+    assert [job.key for job in governor._admit(jobs, [])] == ["large"]
+
+
+def test_history_extrapolates_unseen_jobs_from_overhead_and_rate():
+    history = JobHistory()
+    history.record(make_job("tiny", 1), ToolRun(wall_time=0.1, peak_rss=20000))
+    history.record(make_job("small", 101), ToolRun(wall_time=1.1, peak_rss=21000))
+    history.record(make_job("medium", 201), ToolRun(wall_time=2.1, peak_rss=22000))
+
+    unseen = make_job("huge", 10001)
+    assert history.estimate_peak_rss(unseen) == pytest.approx(20000 + 10000 * 10)
+    assert history.estimate_wall_time(unseen) == pytest.approx(0.1 + 10000 * 0.01)
+
+
+def test_run_tool_measures_child_process():
+    tool_run = run_tool([sys.executable, "-c", "pass"])
+    assert tool_run.wall_time > 0
+
+    with pytest.raises(subprocess.CalledProcessError):
+        run_tool([sys.executable, "-c", "raise SystemExit(3)"])
+
+
+def test_target_and_font_filters():
+    fp = FontProcessor()
+    fp.reference_config = ScreenConfig(width=280, height=280, shape="round")
+    fp.target_configs = [
+        ScreenConfig(width=454, height=454, shape="round", devices=("fenix7x",)),
+        ScreenConfig(width=260, height=260, shape="round"),
+        ScreenConfig(width=148, height=205, shape="rectangle"),
+    ]
+    fp.font_tasks = [
+        FontTask(None, "TimeFont", "Ubuntu", "", "Ubuntu.ttf", 40, 0, "0-9"),
+        FontTask(None, "DataFont", "Roboto", "", "Roboto.ttf", 20, 0, "0-9"),
+    ]
+
+    fp.with_target_filter("rectangle-*,fenix*")
+    assert fp._selected_target_indices() == [0, 2]
+
+    fp.with_font_filter(["Roboto.ttf"])
+    assert [task.font_id for task in fp._selected_font_tasks()] == ["DataFont"]
+
+    with pytest.raises(FontScalerError):
+        fp.with_target_filter("semi-round-*")._selected_target_indices()
+
+
+def make_png(width, height, rows):
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    raw = b"".join(b"\x00" + bytes(row) for row in rows)
+    return write_chunks(
+        [
+            (b"IHDR", header),
+            (b"tEXt", b"Software\x00ttf2bmp"),
+            (b"IDAT", zlib.compress(raw, 0)),
+            (b"IEND", b""),
+        ]
+    )
+
+
+def decode_png_rows(data):
+    chunks = read_chunks(data)
+    width, height = struct.unpack(">II", dict(chunks)[b"IHDR"][:8])
+    filtered = zlib.decompress(b"".join(b for t, b in chunks if t == b"IDAT"))
+    return unfilter_rows(filtered, width * 4, height, 4)
+
+
+def test_optimize_png_is_lossless_and_smaller():
+    # A white glyph column with varying alpha on a transparent background
+    rows = [
+        [
+            channel
+            for x in range(32)
+            for channel in (255, 255, 255, (x * y) % 256 if 8 <= x < 24 else 0)
+        ]
+        for y in range(32)
+    ]
+    original = make_png(32, 32, rows)
+
+    optimized = optimize_png(original)
+
+    assert len(optimized) < len(original)
+    assert b"tEXt" not in optimized
+    assert decode_png_rows(optimized) == decode_png_rows(original)
+
+
+def test_png_optimizer_caches_by_content(tmp_path):
+    page = tmp_path / "Ubuntu-32_0.png"
+    page.write_bytes(make_png(2, 2, [[0] * 8, [255] * 8]))
+    cache_dir = tmp_path / "cache"
+
+    sizes = PngOptimizer(str(cache_dir), max_workers=1).optimize_files([str(page)])
+
+    original, optimized = sizes[str(page)]
+    assert optimized <= original == len(make_png(2, 2, [[0] * 8, [255] * 8]))
+    assert len(list(cache_dir.iterdir())) == 1
+
+
+def test_assembled_font_preserves_glyphs(tmp_path):
+    glyphs = {
+        ord(char): Glyph(
+            width=2 + i,
+            height=3,
+            xoffset=i,
+            yoffset=1,
+            xadvance=4 + i,
+            chnl=15,
+            pixels=bytes([i * 40, 0, 0, 255]) * ((2 + i) * 3),
+        )
+        for i, char in enumerate("AB")
+    }
+    template = parse_fnt(
+        "info face=Ubuntu size=20 spacing=1,1\n"
+        "common lineHeight=24 base=18 scaleW=16 scaleH=16 pages=1\n"
+        'page id=0 file="Ubuntu-20_0.png"\n'
+    )
+    fnt_text, pages = assemble_font(template, glyphs, "Ubuntu-20")
+    assert set(pages) == {"Ubuntu-20_0.png"}
+    assert decode_rgba(pages["Ubuntu-20_0.png"])[:2] == (16, 16)
+
+    (tmp_path / "Ubuntu-20.fnt").write_text(fnt_text)
+    for filename, content in pages.items():
+        (tmp_path / filename).write_bytes(content)
+    font, read_glyphs = read_font(str(tmp_path / "Ubuntu-20.fnt"))
+    assert font.info["face"] == "Ubuntu"
+    assert read_glyphs == glyphs
+
+
+def test_concurrent_glyph_cache_updates_keep_every_glyph(tmp_path):
+    cache = GlyphCache(str(tmp_path))
+    glyph = Glyph(
+        width=1, height=1, xoffset=0, yoffset=0, xadvance=1, chnl=15, pixels=b"\0" * 4
+    )
+
+    def update(codepoint):
+        cache.update(
+            "key",
+            GlyphSet(
+                info={},
+                common={"scaleW": str(codepoint), "scaleH": "16"},
+                page_suffix="_0.png",
+                kerned=False,
+                glyphs={codepoint: glyph},
+            ),
+        )
+
+    threads = [threading.Thread(target=update, args=(cp,)) for cp in range(32, 96)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    cached = cache.load("key")
+    assert sorted(cached.glyphs) == list(range(32, 96))
+    assert cached.common["scaleW"] == "95"
+    assert os.listdir(tmp_path) == ["key.json"]
+
+
+def test_ttf_kerning_tables_are_detected(tmp_path):
+    def sfnt(*tags):
+        records = b"".join(struct.pack(">4sIII", tag, 0, 0, 0) for tag in tags)
+        return b"OTTO" + struct.pack(">HHHH", len(tags), 0, 0, 0) + records
+
+    fonts = {
+        "plain.otf": sfnt(b"cmap", b"glyf"),
+        "gpos.otf": sfnt(b"cmap", b"GPOS"),
+        "fonts.ttc": b"ttcf"
+        + struct.pack(">HHII", 1, 0, 2, 20)
+        + struct.pack(">I", 48)
+        + sfnt(b"cmap")
+        + sfnt(b"kern"),
+        "garbage.ttf": b"not a font",
+    }
+    for filename, content in fonts.items():
+        (tmp_path / filename).write_bytes(content)
+    assert [ttf_has_kerning(str(tmp_path / filename)) for filename in fonts] == [
+        False,
+        True,
+        True,
+        False,
+    ]
+
+
+def test_merge_fonts_renumbers_pages_and_combines_kerning(tmp_path):
+    for part, (chars, pages) in enumerate([("AB", 2), ("C", 1)]):
+        part_dir = tmp_path / str(part)
+        part_dir.mkdir()
+        lines = [
+            "info face=Ubuntu size=20",
+            f"common lineHeight=24 base=18 scaleW=8 scaleH=8 pages={pages}",
+        ]
+        for page in range(pages):
+            lines.append(f'page id={page} file="Ubuntu-20_{page}.png"')
+            (part_dir / f"Ubuntu-20_{page}.png").write_bytes(f"{part}/{page}".encode())
+        for i, char in enumerate(chars):
+            lines.append(
+                f"char id={ord(char)} x=0 y=0 width=2 height=2 xoffset=0 "
+                f"yoffset=0 xadvance=3 page={i % pages} chnl=15"
+            )
+        lines.append(f"kerning first={ord(chars[0])} second={ord(chars[-1])} amount=-1")
+        (part_dir / "Ubuntu-20.fnt").write_text("\n".join(lines) + "\n")
+
+    fnt_text, pages = merge_fonts(
+        [str(tmp_path / "0" / "Ubuntu-20.fnt"), str(tmp_path / "1" / "Ubuntu-20.fnt")],
+        "Ubuntu-20",
+    )
+    font = parse_fnt(fnt_text)
+    assert font.common["pages"] == "3"
+    assert pages == {
+        "Ubuntu-20_0.png": b"0/0",
+        "Ubuntu-20_1.png": b"0/1",
+        "Ubuntu-20_2.png": b"1/0",
+    }
+    assert [font.chars[ord(char)]["page"] for char in "ABC"] == ["0", "1", "2"]
+    assert [(k["first"], k["second"]) for k in font.kernings] == [
+        ("65", "66"),
+        ("67", "67"),
+    ]
+
+
+def test_long_charsets_are_passed_in_a_file_only_when_configured():
+    processor = FontProcessor()
+    long = processor._build_font_tool_command("a.ttf", "x" * 5000, [20], "out")
+    assert long[long.index("-c") + 1] == "x" * 5000
+
+    processor.with_charset_file_option("--charset-file")
+    short = processor._build_font_tool_command("a.ttf", "0123", [20], "out")
+    assert short[short.index("-c") + 1] == "0123"
+
+    long = processor._build_font_tool_command("a.ttf", "x" * 5000, [20], "out")
+    assert "-c" not in long
+    assert long[long.index("--charset-file") + 1] == os.path.join("out", ".charset.txt")
+
+
+def make_benchmark_record(commit, scenario, wall_time, subprocesses):
+    return {
+        "commit": commit,
+        "scenario": scenario,
+        "fonts": 4,
+        "targets": 3,
+        "wallTime": wall_time,
+        "subprocesses": subprocesses,
+        "filesWritten": 9,
+        "peakRss": 20000,
+    }
+
+
+def test_compare_benchmarks_flags_significant_regressions(tmp_path):
+    history = BenchmarkHistory(str(tmp_path / "benchmarks.jsonl"))
+    history.append(
+        [make_benchmark_record("aaa111", "cold", t, 12) for t in (1.0, 1.1, 0.9, 1.0)]
+    )
+    history.append(
+        [make_benchmark_record("bbb222", "cold", t, 12) for t in (1.05, 0.95, 1.0, 1.1)]
+    )
+    assert compare_benchmarks(history.path, file=io.StringIO()) == []
+
+    history.append(
+        [make_benchmark_record("ccc333", "cold", t, 13) for t in (1.5, 1.6, 1.4, 1.5)]
+    )
+    report = io.StringIO()
+    regressions = compare_benchmarks(history.path, baseline="bbb", file=report)
+    assert [r.split(":")[0] for r in regressions] == [
+        "cold subprocesses",
+        "cold wallTime",
+    ]
+    assert "REGRESSION" in report.getvalue()
+
+    with pytest.raises(FontScalerError):
+        compare_benchmarks(history.path, baseline="zzz", file=io.StringIO())
+
+
+def test_compare_benchmarks_skips_dirty_runs_and_other_fixtures(tmp_path):
+    history = BenchmarkHistory(str(tmp_path / "benchmarks.jsonl"))
+    history.append(
+        [make_benchmark_record("aaa111", "cold", t, 12) for t in (1.0, 1.1, 0.9, 1.0)]
+    )
+    small_fixture = dict(make_benchmark_record("bbb222", "cold", 0.1, 2), fonts=1)
+    history.append([small_fixture])
+    history.append(
+        [make_benchmark_record("bbb222", "cold", t, 12) for t in (1.05, 0.95, 1.0, 1.1)]
+    )
+    dirty = dict(make_benchmark_record("bbb222", "cold", 9.0, 99), dirty=True)
+    history.append([dirty])
+
+    report = io.StringIO()
+    assert compare_benchmarks(history.path, file=report) == []
+    assert "(4 fonts, 3 targets)" in report.getvalue()
+
+
+def test_untracked_sources_are_benchmarked_as_dirty(tmp_path):
+    assert current_commit(str(tmp_path)) == ("unknown", True)
+
+    (tmp_path / "garmin_font_scaler").mkdir()
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    assert current_commit(str(tmp_path)) == ("unknown", True)
+
+
+def test_cli_import_does_not_load_pipeline():
+    code = (
+        "import sys, garmin_font_scaler.cli; "
+        "sys.exit('garmin_font_scaler.core' in sys.modules)"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    assert subprocess.run([sys.executable, "-c", code], env=env).returncode == 0
+
+
+def test_daemon_client_does_not_load_pipeline(tmp_path):
+    code = (
+        "import sys\n"
+        "from garmin_font_scaler.cli import main\n"
+        f"sys.argv = ['garmin-font-scaler', '--socket', {str(tmp_path / 'none.sock')!r}]\n"
+        "try:\n"
+        "    main()\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "sys.exit('garmin_font_scaler.core' in sys.modules)"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0
+    assert "Error: Cannot reach daemon" in result.stderr
+
+
+def test_render_cache_evicts_least_recently_used_outputs():
+    cache = RenderCache(max_bytes=10)
+    cache.put("a", {"a.fnt": b"1234"})
+    cache.put("b", {"b.fnt": b"1234"})
+    assert cache.get("a") is not None
+    cache.put("c", {"c.fnt": b"1234"})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size_bytes == 8
+
+    cache.put("huge", {"huge.png": b"x" * 11})
+    assert cache.get("huge") is None and len(cache) == 2
+
+
+def test_render_cache_key_separates_glyph_cache_builds(tmp_path):
+    ttf_path = tmp_path / "Ubuntu.ttf"
+    ttf_path.write_text("dummy binary content")
+    processor = FontProcessor().with_render_cache(RenderCache(), FileFingerprints())
+    plain_key = processor._render_cache_key(str(ttf_path), "0-9", [20])
+    processor.with_glyph_cache(True)
+    assert processor._render_cache_key(str(ttf_path), "0-9", [20]) != plain_key